@@ -3,19 +3,25 @@
 - GET /products: 상품 목록 조회
 - GET /products/{id}: 상품 상세 조회
 """
-from fastapi import APIRouter, HTTPException
-from typing import List
-from pydantic import BaseModel
+from fastapi import APIRouter, HTTPException, Request, Response
+from typing import Dict, List, Optional, Tuple
+from pydantic import BaseModel, TypeAdapter
+import asyncio
+import hashlib
 
+from db.database import get_data_version
 from db.repository import (
     get_all_products,
-    get_product_by_id,
-    get_product_reviews,
-    get_product_qnas,
+    get_product_bundle,
 )
 
 router = APIRouter()
 
+# 조건부 GET 캐시: scope("list" / "detail:{id}") -> (etag, 직렬화된 JSON bytes)
+# - DB 데이터 버전이 같으면 DB 조회와 Pydantic 직렬화를 모두 건너뜁니다.
+_response_cache: Dict[str, Tuple[str, bytes]] = {}
+_CACHE_HEADERS = {"Cache-Control": "no-cache"}  # 항상 재검증(If-None-Match)하도록
+
 
 class Product(BaseModel):
     """상품 기본 정보"""
@@ -61,31 +67,85 @@ class ProductDetail(BaseModel):
     qnas: List[Qna]
 
 
+_PRODUCT_LIST_ADAPTER = TypeAdapter(List[Product])
+
+
+def _make_etag(scope: str) -> str:
+    """scope + DB 데이터 버전으로 약한(weak) ETag를 만듭니다."""
+    digest = hashlib.blake2b(f"{scope}|{get_data_version()}".encode("utf-8"), digest_size=8)
+    return f'W/"{digest.hexdigest()}"'
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [tag.strip() for tag in header.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+def _cached_body(scope: str, etag: str) -> Optional[bytes]:
+    hit = _response_cache.get(scope)
+    if hit is None or hit[0] != etag:
+        return None
+    return hit[1]
+
+
+def _json_response(body: bytes, etag: str) -> Response:
+    return Response(
+        content=body,
+        media_type="application/json",
+        headers={"ETag": etag, **_CACHE_HEADERS},
+    )
+
+
 @router.get("", response_model=List[Product])
-async def list_products():
+async def list_products(request: Request):
     """
     상품 목록 조회
     - 모든 상품의 기본 정보를 반환합니다.
+    - ETag/If-None-Match를 지원합니다. (변경이 없으면 304)
     """
-    products = get_all_products()
-    return products
+    scope = "list"
+    etag = _make_etag(scope)
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers={"ETag": etag, **_CACHE_HEADERS})
+
+    body = _cached_body(scope, etag)
+    if body is None:
+        products = await asyncio.to_thread(get_all_products)
+        body = _PRODUCT_LIST_ADAPTER.dump_json(_PRODUCT_LIST_ADAPTER.validate_python(products))
+        _response_cache[scope] = (etag, body)
+    return _json_response(body, etag)
 
 
 @router.get("/{product_id}", response_model=ProductDetail)
-async def get_product_detail(product_id: int):
+async def get_product_detail(product_id: int, request: Request):
     """
     상품 상세 조회
     - 상품 기본 정보 + 관련 텍스트(설명/리뷰/Q&A) 반환
+    - ETag/If-None-Match를 지원합니다. (변경이 없으면 304)
     """
-    product = get_product_by_id(product_id)
-    if not product:
-        raise HTTPException(status_code=404, detail="상품을 찾을 수 없습니다.")
-
-    reviews = get_product_reviews(product_id)
-    qnas = get_product_qnas(product_id)
-
-    return ProductDetail(
-        product=product,
-        reviews=reviews,
-        qnas=qnas,
-    )
+    scope = f"detail:{product_id}"
+    etag = _make_etag(scope)
+
+    # 304는 상품이 존재할 때만 보냅니다. (If-None-Match: * 로 없는 상품에 304가 나가지 않도록)
+    # 같은 ETag로 캐시된 본문이 있으면 존재가 확인된 것이므로 DB를 다시 조회하지 않습니다.
+    body = _cached_body(scope, etag)
+    if body is None:
+        # 상품/리뷰/Q&A를 한 번의 DB 연결로 조회하고, 동기 I/O는 스레드에서 실행합니다.
+        product, reviews, qnas = await asyncio.to_thread(get_product_bundle, product_id)
+        if not product:
+            raise HTTPException(status_code=404, detail="상품을 찾을 수 없습니다.")
+
+        detail = ProductDetail(
+            product=product,
+            reviews=reviews,
+            qnas=qnas,
+        )
+        body = detail.model_dump_json().encode("utf-8")
+        _response_cache[scope] = (etag, body)
+
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers={"ETag": etag, **_CACHE_HEADERS})
+    return _json_response(body, etag)
@@ -4,9 +4,9 @@ SQLite 데이터베이스 연결 및 초기화
 """
 import sqlite3
 import os
-from pathlib import Path
 import logging
-from typing import Optional
+import threading
+from typing import List, Optional
 
 logger = logging.getLogger(__name__)
 
@@ -16,31 +16,153 @@ def _resolve_db_path() -> str:
     SQLite DB 경로를 결정합니다.
     - 기본값은 backend/data/chatbot.db (실행 cwd에 영향받지 않도록)
     - DATABASE_PATH 환경변수가 상대경로면 backend 루트 기준으로 해석합니다.
+    - os.path.abspath는 문자열 정규화만 하므로 Path.resolve()처럼 경로 구성요소마다 stat 하지 않습니다.
     """
-    backend_root = Path(__file__).resolve().parents[1]
-    default_path = backend_root / "data" / "chatbot.db"
+    backend_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
     raw = os.getenv("DATABASE_PATH")
     if not raw:
-        return str(default_path)
-    p = Path(raw)
-    if not p.is_absolute():
-        p = backend_root / p
-    return str(p.resolve())
+        return os.path.join(backend_root, "data", "chatbot.db")
+    if not os.path.isabs(raw):
+        raw = os.path.join(backend_root, raw)
+    return os.path.abspath(raw)
 
 
 DB_PATH = _resolve_db_path()
 
+# 데이터 디렉토리 생성 (연결마다 mkdir 하지 않도록 import 시 한 번만)
+_DB_PARENT = os.path.dirname(DB_PATH)
+os.makedirs(_DB_PARENT, exist_ok=True)
 
-def get_connection():
-    """데이터베이스 연결 반환"""
-    # 데이터 디렉토리 생성
-    Path(DB_PATH).parent.mkdir(parents=True, exist_ok=True)
-    
-    conn = sqlite3.connect(DB_PATH)
+
+# journal_mode=WAL은 DB 파일에 영구 저장되므로 프로세스당 한 번만 설정합니다.
+_wal_enabled = False
+
+# 연결 단위 PRAGMA (연결마다 적용 필요)
+_CONNECTION_PRAGMAS = (
+    "PRAGMA synchronous=NORMAL",  # WAL에서는 NORMAL로도 커밋 내구성이 충분하고 fsync가 줄어듭니다.
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-64000",  # 약 64MB 페이지 캐시
+    "PRAGMA mmap_size=268435456",  # 256MB
+    "PRAGMA foreign_keys=ON",  # 리뷰/QnA의 product_id 참조 무결성 검사
+)
+
+
+def _apply_pragmas(conn: sqlite3.Connection) -> None:
+    global _wal_enabled
+    if not _wal_enabled:
+        # WAL: 쓰기 중에도 읽기가 막히지 않고, 커밋당 fsync가 줄어듭니다.
+        conn.execute("PRAGMA journal_mode=WAL")
+        _wal_enabled = True
+    for pragma in _CONNECTION_PRAGMAS:
+        conn.execute(pragma)
+
+
+# 스레드별로 연결을 재사용합니다. (요청마다 파일 open + PRAGMA 적용을 반복하지 않도록)
+# - sqlite3 연결은 스레드 간 동시 사용이 안전하지 않으므로 전역 1개가 아닌 스레드 로컬로 둡니다.
+_local = threading.local()
+_connections: List[sqlite3.Connection] = []
+_connections_lock = threading.Lock()
+_generation = 0
+
+
+def _make_dict_row_factory():
+    """
+    행을 바로 dict로 만드는 row_factory를 연결별로 생성합니다. (sqlite3.Row 생성 후 dict()로 다시 복사하지 않도록)
+    - 컬럼명 튜플은 쿼리 결과(cursor.description)가 바뀔 때만 다시 만들고 행마다 재사용합니다.
+    - 연결이 스레드별이므로 클로저 상태를 스레드 간에 공유하지 않습니다.
+    """
+    last_description = None
+    keys: tuple = ()
+
+    def factory(cursor: sqlite3.Cursor, row: tuple) -> dict:
+        nonlocal last_description, keys
+        description = cursor.description
+        if description is not last_description:
+            last_description = description
+            keys = tuple(col[0] for col in description)
+        return dict(zip(keys, row))
+
+    return factory
+
+
+def _cached_connection(attr: str, *, read_only: bool) -> sqlite3.Connection:
+    conn = getattr(_local, attr, None)
+    if conn is not None and getattr(_local, attr + "_generation", None) == _generation:
+        return conn
+
+    # isolation_level=None: 드라이버의 암묵적 BEGIN/COMMIT을 끄고, 쓰기 트랜잭션은
+    # 호출자가 BEGIN IMMEDIATE ... COMMIT으로 명시합니다. (읽기는 자동 커밋)
+    # cached_statements: 반복되는 조회 SQL을 다시 컴파일하지 않도록 statement 캐시를 넉넉히 둡니다.
+    conn = sqlite3.connect(
+        DB_PATH,
+        check_same_thread=False,
+        isolation_level=None,
+        cached_statements=256,
+    )
     conn.row_factory = sqlite3.Row  # dict 형태로 결과 반환
+    _apply_pragmas(conn)
+    if read_only:
+        conn.execute("PRAGMA query_only=ON")
+        # 리포지토리는 결과를 dict로 반환하므로 읽기 연결은 dict를 직접 생성합니다.
+        conn.row_factory = _make_dict_row_factory()
+
+    with _connections_lock:
+        _connections.append(conn)
+    setattr(_local, attr, conn)
+    setattr(_local, attr + "_generation", _generation)
     return conn
 
 
+def get_connection():
+    """
+    데이터베이스 연결 반환 (읽기/쓰기)
+    - 현재 스레드의 캐시된 연결을 반환하므로 호출자는 close()하지 않습니다.
+    """
+    return _cached_connection("conn", read_only=False)
+
+
+def get_read_connection():
+    """
+    읽기 전용 연결 반환 (리포지토리 조회용)
+    - 스레드별 캐시이므로 to_thread 워커 수만큼의 읽기 풀처럼 동작합니다.
+    - WAL 모드에서 쓰기 연결과 동시에 읽을 수 있고, query_only로 실수로 쓰는 것을 막습니다.
+    """
+    return _cached_connection("read_conn", read_only=True)
+
+
+def close_connections() -> None:
+    """캐시된 모든 연결을 닫습니다. (앱 종료 시)"""
+    global _generation
+    with _connections_lock:
+        _generation += 1
+        for conn in _connections:
+            try:
+                conn.close()
+            except Exception:
+                pass
+        _connections.clear()
+
+
+def get_data_version() -> str:
+    """
+    DB 파일 상태(mtime/size) 기반의 데이터 버전 문자열을 반환합니다.
+    - 쿼리 없이 stat만으로 계산하므로 조건부 GET(ETag)의 검증 비용이 거의 없습니다.
+    - WAL 모드에서는 커밋이 -wal 파일에 먼저 기록되므로 함께 반영합니다.
+    - -wal 파일은 첫 연결이 열릴 때 생기므로, 연결을 먼저 연 뒤에 stat 합니다.
+      (그렇지 않으면 프로세스의 첫 버전 문자열이 "-wal 없음" 상태로 만들어져 이후 다시 일치하지 않습니다)
+    """
+    get_read_connection()  # 스레드별 캐시 연결이라 두 번째 호출부터는 비용이 없습니다.
+    parts = []
+    for path in (DB_PATH, DB_PATH + "-wal"):
+        try:
+            st = os.stat(path)
+        except OSError:
+            parts.append("-")
+            continue
+        parts.append(f"{st.st_mtime_ns}:{st.st_size}")
+    return "|".join(parts)
+
+
 def _drop_existing_tables(cursor):
     cursor.executescript(
         """
@@ -51,74 +173,87 @@ def _drop_existing_tables(cursor):
     )
 
 
+_TABLES_DDL = """
+-- products 테이블
+CREATE TABLE IF NOT EXISTS products (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    image_url TEXT,
+    price INTEGER NOT NULL,
+    category TEXT,
+    description TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- order_reviews 테이블 (주문 리뷰)
+CREATE TABLE IF NOT EXISTS order_reviews (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    product_id INTEGER NOT NULL,
+    user_name TEXT,
+    review_text TEXT NOT NULL,
+    rating INTEGER CHECK(rating >= 1 AND rating <= 5),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (product_id) REFERENCES products(id)
+);
+
+-- product_qna 테이블 (상품 QnA)
+CREATE TABLE IF NOT EXISTS product_qna (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    product_id INTEGER NOT NULL,
+    question TEXT NOT NULL,
+    answer TEXT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (product_id) REFERENCES products(id)
+);
+"""
+
+# 보조 인덱스 (검색 성능 향상)
+_INDEX_STATEMENTS = (
+    "CREATE INDEX IF NOT EXISTS idx_order_reviews_product_id ON order_reviews(product_id)",
+    "CREATE INDEX IF NOT EXISTS idx_product_qna_product_id ON product_qna(product_id)",
+)
+_INDEX_NAMES = ("idx_order_reviews_product_id", "idx_product_qna_product_id")
+
+
 def _create_tables(cursor):
-    # products 테이블
-    cursor.execute(
-        """
-        CREATE TABLE IF NOT EXISTS products (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            image_url TEXT,
-            price INTEGER NOT NULL,
-            category TEXT,
-            description TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-        """
-    )
+    """테이블/인덱스 DDL을 하나의 스크립트로 실행합니다. (문장별 execute 왕복 제거)"""
+    cursor.executescript(_TABLES_DDL + "".join(f"{stmt};\n" for stmt in _INDEX_STATEMENTS))
 
-    # order_reviews 테이블 (주문 리뷰)
-    cursor.execute(
-        """
-        CREATE TABLE IF NOT EXISTS order_reviews (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            product_id INTEGER NOT NULL,
-            user_name TEXT,
-            review_text TEXT NOT NULL,
-            rating INTEGER CHECK(rating >= 1 AND rating <= 5),
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (product_id) REFERENCES products(id)
-        )
-        """
-    )
 
-    # product_qna 테이블 (상품 QnA)
-    cursor.execute(
-        """
-        CREATE TABLE IF NOT EXISTS product_qna (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            product_id INTEGER NOT NULL,
-            question TEXT NOT NULL,
-            answer TEXT NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (product_id) REFERENCES products(id)
-        )
-        """
-    )
+def create_indexes(cursor):
+    """
+    보조 인덱스 생성
+    - 대량 삽입(시드) 시에는 삽입 후에 생성하는 편이 행마다 B-tree를 갱신하는 것보다 빠릅니다.
+    - executescript는 진행 중인 트랜잭션을 먼저 커밋하므로, 트랜잭션 안에서 쓰도록 문장별로 실행합니다.
+    """
+    for stmt in _INDEX_STATEMENTS:
+        cursor.execute(stmt)
 
-    # 인덱스 생성 (검색 성능 향상)
-    cursor.execute(
-        """
-        CREATE INDEX IF NOT EXISTS idx_order_reviews_product_id 
-        ON order_reviews(product_id)
-        """
-    )
 
-    cursor.execute(
-        """
-        CREATE INDEX IF NOT EXISTS idx_product_qna_product_id 
-        ON product_qna(product_id)
-        """
-    )
+def drop_indexes(cursor):
+    """대량 삽입 전에 보조 인덱스를 제거합니다. (삽입 후 create_indexes로 재생성)"""
+    for name in _INDEX_NAMES:
+        cursor.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+# 스키마(테이블/인덱스) 버전. DDL을 바꾸면 올려서 기존 DB에서도 DDL이 다시 실행되도록 합니다.
+SCHEMA_VERSION = 1
 
 
 def init_db(*, reset: bool = False):
     """
     데이터베이스 초기화
     - reset=True일 경우 테이블을 드롭 후 재생성 (개발용)
+    - PRAGMA user_version이 SCHEMA_VERSION과 같으면 DDL을 건너뜁니다. (웜 스타트)
     """
     conn = get_connection()
     cursor = conn.cursor()
+
+    if not reset:
+        row = cursor.execute("PRAGMA user_version").fetchone()
+        if row and row[0] == SCHEMA_VERSION:
+            logger.info("테이블 확인 완료 (schema v%s)", SCHEMA_VERSION)
+            return
     
     try:
         if reset:
@@ -126,12 +261,19 @@ def init_db(*, reset: bool = False):
             _drop_existing_tables(cursor)
 
         _create_tables(cursor)
+        cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
         conn.commit()
         logger.info("테이블 생성/확인 완료")
+
+        # 테이블이 (재)생성되었으므로 이전 조회 결과 캐시를 버립니다. (순환 import 방지를 위해 지연 import)
+        from db.repository import clear_product_cache
+
+        clear_product_cache()
+
+        # 통계가 없거나 오래된 테이블만 골라 ANALYZE 합니다. (변경이 없으면 거의 no-op)
+        cursor.execute("PRAGMA optimize")
             
     except Exception as e:
         logger.error(f"데이터베이스 초기화 실패: {str(e)}")
         conn.rollback()
         raise
-    finally:
-        conn.close()
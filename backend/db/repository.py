@@ -3,133 +3,227 @@
 - 상품 조회
 - 상품 텍스트 조회 (여러 테이블 통합)
 """
-from typing import List, Optional, Dict, Any
-from db.database import get_connection
+from collections import namedtuple
+from functools import lru_cache
+import json
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from db.database import get_read_connection
+
+
+# RAG 인덱싱용 텍스트 행. 청커가 필드만 읽고 버리므로 dict 대신 가벼운 namedtuple로 받습니다.
+ProductText = namedtuple("ProductText", "id product_id type content")
+
+
+def _product_text_row(cursor, row: tuple) -> ProductText:
+    return ProductText(*row)
+
+
+# 자주 쓰는 조회 SQL은 모듈 상수로 두어, 연결의 prepared statement 캐시(cached_statements)에서
+# 항상 같은 문장으로 재사용되도록 합니다.
+_SQL_ALL_PRODUCTS = """
+    SELECT id, name, image_url, price, category, description
+    FROM products
+    ORDER BY id
+"""
+
+_SQL_PRODUCT_BY_ID = """
+    SELECT id, name, image_url, price, category, description
+    FROM products
+    WHERE id = ?
+"""
+
+_SQL_PRODUCT_REVIEWS = """
+    SELECT id, product_id, user_name, review_text, rating, created_at
+    FROM order_reviews
+    WHERE product_id = ?
+    ORDER BY datetime(created_at) DESC, id DESC
+"""
+
+_SQL_PRODUCT_QNAS = """
+    SELECT id, product_id, question, answer, created_at
+    FROM product_qna
+    WHERE product_id = ?
+    ORDER BY datetime(created_at) DESC, id DESC
+"""
 
 
 def get_all_products() -> List[Dict[str, Any]]:
     """모든 상품 목록 조회"""
-    conn = get_connection()
+    conn = get_read_connection()
     cursor = conn.cursor()
     
-    cursor.execute("""
-        SELECT id, name, image_url, price, category, description
-        FROM products
-        ORDER BY id
-    """)
-    
-    products = [dict(row) for row in cursor.fetchall()]
-    conn.close()
-    
-    return products
+    cursor.execute(_SQL_ALL_PRODUCTS)
+    return cursor.fetchall()
 
 
 def get_product_by_id(product_id: int) -> Optional[Dict[str, Any]]:
-    """특정 상품 조회"""
-    conn = get_connection()
+    """
+    특정 상품 조회
+    - 상품 카탈로그는 작고 거의 바뀌지 않으므로 product_id별로 프로세스 내 캐시합니다.
+    - 캐시 값이 공유되므로 호출자에게는 복사본을 반환합니다.
+    """
+    product = _get_product_by_id_cached(product_id)
+    return dict(product) if product else None
+
+
+@lru_cache(maxsize=1024)
+def _get_product_by_id_cached(product_id: int) -> Optional[Dict[str, Any]]:
+    conn = get_read_connection()
     cursor = conn.cursor()
     
-    cursor.execute("""
-        SELECT id, name, image_url, price, category, description
+    cursor.execute(_SQL_PRODUCT_BY_ID, (product_id,))
+    return cursor.fetchone()
+
+
+def clear_product_cache() -> None:
+    """상품 데이터가 바뀌었을 때(스키마 리셋/시드 등) 상품 캐시를 비웁니다."""
+    _get_product_by_id_cached.cache_clear()
+
+
+_SQL_PRODUCT_TEXTS = """
+    SELECT id, product_id, type, content FROM (
+        SELECT 0 AS src, id, id AS product_id, 'description' AS type, description AS content
         FROM products
-        WHERE id = ?
-    """, (product_id,))
-    
-    row = cursor.fetchone()
-    conn.close()
-    
-    return dict(row) if row else None
+        WHERE id = :pid AND description IS NOT NULL AND description != ''
+        UNION ALL
+        SELECT 1, id, product_id, 'review', review_text
+        FROM order_reviews
+        WHERE product_id = :pid
+        UNION ALL
+        SELECT 2, id, product_id, 'qna', 'Q: ' || question || char(10) || 'A: ' || answer
+        FROM product_qna
+        WHERE product_id = :pid
+    )
+    WHERE :type IS NULL OR type = :type
+    ORDER BY id DESC, src
+"""
 
 
 def get_product_texts(product_id: int, text_type: Optional[str] = None) -> List[Dict[str, Any]]:
     """
     특정 상품의 텍스트 조회 (설명/리뷰/Q&A 통합)
+    - 세 테이블을 UNION ALL 한 번으로 읽고, 타입 필터/정렬도 SQLite에서 처리합니다.
+    - 최신순: id 내림차순(각 테이블별 autoincrement) 기준
     
     Args:
         product_id: 상품 ID
         text_type: 텍스트 타입 필터 (description/review/qna)
     """
-    texts: List[Dict[str, Any]] = []
-
-    # 1) description은 products.description에서 가져옵니다.
-    product = get_product_by_id(product_id)
-    if product and product.get("description"):
-        texts.append(
-            {
-                "id": product["id"],
-                "product_id": product["id"],
-                "type": "description",
-                "content": product["description"],
-            }
-        )
+    conn = get_read_connection()
+    cursor = conn.cursor()
+    cursor.execute(_SQL_PRODUCT_TEXTS, {"pid": product_id, "type": text_type or None})
+    return cursor.fetchall()
 
-    # 2) 리뷰
-    for r in get_product_reviews(product_id):
-        texts.append(
-            {
-                "id": r["id"],
-                "product_id": r["product_id"],
-                "type": "review",
-                "content": r["review_text"],
-            }
-        )
 
-    # 3) QnA
-    for q in get_product_qnas(product_id):
-        texts.append(
-            {
-                "id": q["id"],
-                "product_id": q["product_id"],
-                "type": "qna",
-                "content": f"Q: {q['question']}\nA: {q['answer']}",
-            }
+def get_product_reviews(product_id: int) -> List[Dict[str, Any]]:
+    """특정 상품의 리뷰 조회 (최신순)"""
+    conn = get_read_connection()
+    cursor = conn.cursor()
+    cursor.execute(_SQL_PRODUCT_REVIEWS, (product_id,))
+    return cursor.fetchall()
+
+
+def get_product_qnas(product_id: int) -> List[Dict[str, Any]]:
+    """특정 상품의 Q&A 조회 (최신순)"""
+    conn = get_read_connection()
+    cursor = conn.cursor()
+    cursor.execute(_SQL_PRODUCT_QNAS, (product_id,))
+    return cursor.fetchall()
+
+
+def get_product_bundle(
+    product_id: int,
+) -> Tuple[Optional[Dict[str, Any]], List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    상품 상세 화면용 (상품, 리뷰, Q&A)를 한 번의 연결/트랜잭션으로 조회
+
+    Returns:
+        (product, reviews, qnas) - 상품이 없으면 (None, [], [])
+    """
+    conn = get_read_connection()
+    cursor = conn.cursor()
+    cursor.execute(_SQL_PRODUCT_BY_ID, (product_id,))
+    product = cursor.fetchone()
+    if not product:
+        return None, [], []
+
+    cursor.execute(_SQL_PRODUCT_REVIEWS, (product_id,))
+    reviews = cursor.fetchall()
+
+    cursor.execute(_SQL_PRODUCT_QNAS, (product_id,))
+    qnas = cursor.fetchall()
+    return product, reviews, qnas
+
+
+def _product_texts_sql(*, filter_by_ids: bool = False) -> str:
+    """
+    description/review/qna 텍스트를 UNION ALL 한 번으로 조회하는 SQL
+    - 세 번의 쿼리/fetchall 대신 한 번 계획하고 한 결과 집합으로 읽습니다.
+    - 정렬은 기존과 같이 (description → review → qna), 그 안에서 product_id, id 순입니다.
+    - filter_by_ids=True면 :ids(JSON 배열) 하나로 필터링합니다. ID 개수와 무관하게 SQL이 같아
+      statement 캐시가 재사용됩니다. (개수만큼 ?를 만드는 동적 IN 절 대신 json_each 사용)
+    """
+    id_subquery = "(SELECT value FROM json_each(:ids))"
+    product_filter = f"AND id IN {id_subquery}" if filter_by_ids else ""
+    text_filter = f"AND product_id IN {id_subquery}" if filter_by_ids else ""
+    return f"""
+        SELECT id, product_id, type, content FROM (
+            SELECT 0 AS src, id, id AS product_id, 'description' AS type, description AS content
+            FROM products
+            WHERE description IS NOT NULL AND description != '' {product_filter}
+            UNION ALL
+            SELECT 1, id, product_id, 'review', review_text
+            FROM order_reviews
+            WHERE review_text IS NOT NULL AND review_text != '' {text_filter}
+            UNION ALL
+            SELECT 2, id, product_id, 'qna', 'Q: ' || question || char(10) || 'A: ' || answer
+            FROM product_qna
+            WHERE question IS NOT NULL AND answer IS NOT NULL {text_filter}
         )
+        ORDER BY src, product_id, id
+    """
 
-    if text_type:
-        texts = [t for t in texts if t.get("type") == text_type]
 
-    # 최신순: id 내림차순(각 테이블별 autoincrement) 기준
-    texts.sort(key=lambda t: t.get("id", 0), reverse=True)
-    return texts
+_ALL_PRODUCT_TEXTS_SQL = _product_texts_sql()
+_PRODUCT_TEXTS_BY_IDS_SQL = _product_texts_sql(filter_by_ids=True)
 
+# fetchall로 전체 결과를 한 번에 올리지 않고 이 크기씩 나눠 읽습니다.
+_FETCH_BATCH_SIZE = 1000
 
-def get_product_reviews(product_id: int) -> List[Dict[str, Any]]:
-    """특정 상품의 리뷰 조회 (최신순)"""
-    conn = get_connection()
+
+def _iter_rows(cursor) -> Iterator[ProductText]:
+    while True:
+        rows = cursor.fetchmany(_FETCH_BATCH_SIZE)
+        if not rows:
+            return
+        yield from rows
+
+
+def iter_all_product_texts() -> Iterator[ProductText]:
+    """
+    모든 상품 텍스트를 스트리밍으로 조회 (RAG 인덱싱용)
+    - 결과를 리스트로 만들지 않으므로 최대 메모리가 배치 하나 크기로 줄어듭니다.
+    - 행은 ProductText(namedtuple)로 반환합니다. (행마다 dict를 만들지 않음)
+    """
+    conn = get_read_connection()
     cursor = conn.cursor()
-    cursor.execute(
-        """
-        SELECT id, product_id, user_name, review_text, rating, created_at
-        FROM order_reviews
-        WHERE product_id = ?
-        ORDER BY datetime(created_at) DESC, id DESC
-        """,
-        (product_id,),
-    )
-    rows = [dict(row) for row in cursor.fetchall()]
-    conn.close()
-    return rows
+    cursor.row_factory = _product_text_row
+    cursor.execute(_ALL_PRODUCT_TEXTS_SQL)
+    yield from _iter_rows(cursor)
 
 
-def get_product_qnas(product_id: int) -> List[Dict[str, Any]]:
-    """특정 상품의 Q&A 조회 (최신순)"""
-    conn = get_connection()
+def iter_product_texts_by_ids(product_ids: List[int]) -> Iterator[ProductText]:
+    """선택된 제품 ID 리스트의 텍스트를 스트리밍으로 조회 (RAG 인덱싱용, 행은 ProductText)"""
+    if not product_ids:
+        return
+    conn = get_read_connection()
     cursor = conn.cursor()
-    cursor.execute(
-        """
-        SELECT id, product_id, question, answer, created_at
-        FROM product_qna
-        WHERE product_id = ?
-        ORDER BY datetime(created_at) DESC, id DESC
-        """,
-        (product_id,),
-    )
-    rows = [dict(row) for row in cursor.fetchall()]
-    conn.close()
-    return rows
+    cursor.row_factory = _product_text_row
+    cursor.execute(_PRODUCT_TEXTS_BY_IDS_SQL, {"ids": json.dumps([int(pid) for pid in product_ids])})
+    yield from _iter_rows(cursor)
 
 
-def get_all_product_texts() -> List[Dict[str, Any]]:
+def get_all_product_texts() -> List[ProductText]:
     """
     모든 상품 텍스트 조회 (RAG 인덱싱용)
     - products.description
@@ -137,51 +231,10 @@ def get_all_product_texts() -> List[Dict[str, Any]]:
     - product_qna.question + answer
     를 통합하여 반환
     """
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    texts = []
-    
-    # 1. products 테이블의 description
-    cursor.execute("""
-        SELECT id, id as product_id, 'description' as type, description as content
-        FROM products
-        WHERE description IS NOT NULL AND description != ''
-        ORDER BY id
-    """)
-    for row in cursor.fetchall():
-        texts.append(dict(row))
-    
-    # 2. order_reviews 테이블의 review_text
-    cursor.execute("""
-        SELECT id, product_id, 'review' as type, review_text as content
-        FROM order_reviews
-        WHERE review_text IS NOT NULL AND review_text != ''
-        ORDER BY product_id, id
-    """)
-    for row in cursor.fetchall():
-        texts.append(dict(row))
-    
-    # 3. product_qna 테이블의 question + answer
-    cursor.execute("""
-        SELECT 
-            id, 
-            product_id, 
-            'qna' as type, 
-            'Q: ' || question || '\nA: ' || answer as content
-        FROM product_qna
-        WHERE question IS NOT NULL AND answer IS NOT NULL
-        ORDER BY product_id, id
-    """)
-    for row in cursor.fetchall():
-        texts.append(dict(row))
-    
-    conn.close()
-    
-    return texts
+    return list(iter_all_product_texts())
 
 
-def get_product_texts_by_ids(product_ids: List[int]) -> List[Dict[str, Any]]:
+def get_product_texts_by_ids(product_ids: List[int]) -> List[ProductText]:
     """
     선택된 제품 ID 리스트의 텍스트 조회 (RAG 인덱싱용)
     - products.description
@@ -195,52 +248,4 @@ def get_product_texts_by_ids(product_ids: List[int]) -> List[Dict[str, Any]]:
     Returns:
         텍스트 리스트
     """
-    if not product_ids:
-        return []
-    
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    texts = []
-    placeholders = ','.join(['?'] * len(product_ids))
-    
-    # 1. products 테이블의 description
-    cursor.execute(f"""
-        SELECT id, id as product_id, 'description' as type, description as content
-        FROM products
-        WHERE id IN ({placeholders}) 
-        AND description IS NOT NULL AND description != ''
-        ORDER BY id
-    """, product_ids)
-    for row in cursor.fetchall():
-        texts.append(dict(row))
-    
-    # 2. order_reviews 테이블의 review_text
-    cursor.execute(f"""
-        SELECT id, product_id, 'review' as type, review_text as content
-        FROM order_reviews
-        WHERE product_id IN ({placeholders})
-        AND review_text IS NOT NULL AND review_text != ''
-        ORDER BY product_id, id
-    """, product_ids)
-    for row in cursor.fetchall():
-        texts.append(dict(row))
-    
-    # 3. product_qna 테이블의 question + answer
-    cursor.execute(f"""
-        SELECT 
-            id, 
-            product_id, 
-            'qna' as type, 
-            'Q: ' || question || '\nA: ' || answer as content
-        FROM product_qna
-        WHERE product_id IN ({placeholders})
-        AND question IS NOT NULL AND answer IS NOT NULL
-        ORDER BY product_id, id
-    """, product_ids)
-    for row in cursor.fetchall():
-        texts.append(dict(row))
-    
-    conn.close()
-    
-    return texts
+    return list(iter_product_texts_by_ids(product_ids))
@@ -0,0 +1,101 @@
+"""
+LLM 응답 캐시
+- 최종 프롬프트(엔진/모델/생성 설정 포함)가 완전히 같으면 LLM 호출 없이 직전 응답 텍스트를 재사용합니다.
+- 프롬프트 조립과 분리해, 캐시 키는 "실제로 전송되는 프롬프트" 경계에서만 만듭니다.
+- 같은 키의 동시 미스는 한 번만 호출하고 결과를 나눠 씁니다. (stampede 방지)
+"""
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+import asyncio
+import hashlib
+import threading
+import time
+
+from utils.env import load_float_env, load_int_env
+
+
+_MAX_ENTRIES = load_int_env("LLM_PROMPT_CACHE_MAX_ENTRIES", 4096)
+_TTL_SECONDS = load_float_env("LLM_PROMPT_CACHE_TTL_SECONDS", 3600.0)
+
+# key(16바이트 digest) -> (저장 시각, 응답 텍스트). 끝쪽이 최근 사용.
+_entries: "OrderedDict[bytes, Tuple[float, str]]" = OrderedDict()
+_lock = threading.Lock()
+
+
+# key -> 진행 중인 LLM 호출 task (이벤트 루프 스레드에서만 접근)
+_inflight: Dict[bytes, "asyncio.Task[str]"] = {}
+
+
+def prompt_key(namespace: str, prompt: str) -> bytes:
+    """
+    namespace + 프롬프트를 128bit blake2b digest로 요약합니다. (긴 프롬프트를 키로 들고 있지 않도록)
+    - namespace에는 엔진/모델명/생성 설정을 담아, 설정이 바뀌면 다른 키가 되도록 합니다.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    h.update(namespace.encode("utf-8"))
+    h.update(b"\0")
+    h.update(prompt.encode("utf-8"))
+    return h.digest()
+
+
+def get(key: bytes) -> Optional[str]:
+    """캐시된 응답 텍스트를 반환합니다. (없거나 만료되면 None)"""
+    now = time.monotonic()
+    with _lock:
+        hit = _entries.get(key)
+        if hit is None:
+            return None
+        stored_at, text = hit
+        if _TTL_SECONDS > 0 and now - stored_at >= _TTL_SECONDS:
+            del _entries[key]
+            return None
+        _entries.move_to_end(key)
+        return text
+
+
+def put(key: bytes, text: str) -> None:
+    """응답 텍스트를 저장합니다. 상한을 넘으면 가장 오래 사용되지 않은 항목부터 제거합니다."""
+    if _MAX_ENTRIES <= 0:
+        return
+    with _lock:
+        _entries[key] = (time.monotonic(), text)
+        _entries.move_to_end(key)
+        while len(_entries) > _MAX_ENTRIES:
+            _entries.popitem(last=False)
+
+
+async def get_or_generate(key: bytes, producer: Callable[[], Awaitable[str]]) -> Tuple[str, bool]:
+    """
+    캐시를 조회하고, 없으면 producer로 생성합니다.
+    - 같은 key로 이미 진행 중인 호출이 있으면 새로 호출하지 않고 그 결과를 기다립니다.
+    - producer는 별도 task로 실행하고 모든 호출자(처음 호출자 포함)가 shield로 기다립니다.
+      그래서 한 호출자가 취소되어도(클라이언트 연결 끊김 등) 나머지 호출자는 결과를 받습니다.
+    - 저장(put)은 호출자가 결과 검증 후 수행합니다. (검증 실패 응답이 캐시되지 않도록)
+
+    Returns:
+        (응답 텍스트, 캐시 적중 여부)
+    """
+    cached = get(key)
+    if cached is not None:
+        return cached, True
+
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(producer())
+        _inflight[key] = task
+        task.add_done_callback(lambda t: _on_inflight_done(key, t))
+    return await asyncio.shield(task), False
+
+
+def _on_inflight_done(key: bytes, task: "asyncio.Task[str]") -> None:
+    if _inflight.get(key) is task:
+        del _inflight[key]
+    # 기다리던 호출자가 모두 취소된 경우 "exception was never retrieved" 경고 방지
+    if not task.cancelled():
+        task.exception()
+
+
+def clear() -> None:
+    """캐시 전체를 비웁니다."""
+    with _lock:
+        _entries.clear()
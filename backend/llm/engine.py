@@ -4,25 +4,41 @@ LLM 엔진 통합 인터페이스
 - 공통 인터페이스 제공
 """
 import logging
-from llm.gemini_engine import init_gemini, generate_gemini, is_gemini_available
+from types import MappingProxyType
+from typing import Mapping
+
+from llm.gemini_engine import (
+    gemini_cache_namespace,
+    generate_gemini,
+    init_gemini,
+    is_gemini_available,
+)
 
 logger = logging.getLogger(__name__)
 
+# 엔진 가용성은 초기화 시점에 한 번 계산해 두고, 요청마다 다시 확인하지 않습니다.
+_GEMINI_OK = False
+_available_engines: Mapping[str, bool] = MappingProxyType({"gemini": False})
+
 
-async def init_llm_engines():
+def init_llm_engines():
     """
     모든 LLM 엔진 초기화
     - Gemini API 초기화
+    - 대기(await)할 작업이 없으므로 동기 함수입니다.
     """
+    global _GEMINI_OK, _available_engines
+
     logger.info("LLM 엔진 초기화 시작...")
     
     # Gemini 초기화
     init_gemini()
     
     # 사용 가능한 엔진 확인
-    available_engines = []
-    if is_gemini_available():
-        available_engines.append("gemini")
+    _GEMINI_OK = is_gemini_available()
+    _available_engines = MappingProxyType({"gemini": _GEMINI_OK})
+
+    available_engines = [name for name, ok in _available_engines.items() if ok]
     
     if not available_engines:
         logger.error("사용 가능한 LLM 엔진이 없습니다")
@@ -45,7 +61,7 @@ async def generate_answer(prompt: str, engine: str = "gemini") -> str:
     if engine != "gemini":
         raise ValueError(f"지원하지 않는 엔진: {engine}")
 
-    if not is_gemini_available():
+    if not _GEMINI_OK:
         raise RuntimeError(
             "Gemini API를 사용할 수 없습니다. "
             "google-generativeai 설치 및 .env의 GEMINI_API_KEY 설정을 확인해주세요."
@@ -53,9 +69,14 @@ async def generate_answer(prompt: str, engine: str = "gemini") -> str:
     return await generate_gemini(prompt)
 
 
-def get_available_engines() -> dict:
-    """사용 가능한 엔진 목록 반환"""
-    return {
-        "gemini": is_gemini_available()
-    }
+def get_cache_namespace(engine: str = "gemini") -> str:
+    """응답 캐시 키용 엔진 식별자 (엔진 + 모델명 + 생성 설정)"""
+    if engine != "gemini":
+        raise ValueError(f"지원하지 않는 엔진: {engine}")
+    return gemini_cache_namespace()
+
+
+def get_available_engines() -> Mapping[str, bool]:
+    """사용 가능한 엔진 목록 반환 (초기화 시 계산된 읽기 전용 매핑)"""
+    return _available_engines
 
@@ -3,15 +3,19 @@ Gemini API 엔진
 - Google Generative AI 사용
 - API 키는 환경 변수에서 로드
 """
+import asyncio
 import os
 import logging
 import json
 import urllib.request
 import urllib.error
+import random
 import time
-from typing import Optional
+from typing import Mapping, Optional, Tuple
 from dataclasses import dataclass
 
+from utils.env import load_float_env, load_int_env
+
 # google-generativeai는 선택 의존성일 수 있으므로, import 실패 시에도
 # 서버가 기동될 수 있도록 방어적으로 처리합니다.
 try:
@@ -22,12 +26,69 @@ except Exception as _e:  # pragma: no cover
 else:
     _GENAI_IMPORT_ERROR = None
 
+# REST 폴백의 연결 재사용(keep-alive)용. 없으면 표준 라이브러리 urllib로 동작합니다.
+try:
+    import urllib3  # type: ignore
+except Exception:  # pragma: no cover
+    urllib3 = None  # type: ignore
+
+# 요청/응답 JSON 처리용 (C 구현). 없으면 표준 json으로 동작합니다.
+try:
+    import orjson  # type: ignore
+except Exception:  # pragma: no cover
+    orjson = None  # type: ignore
+
 logger = logging.getLogger(__name__)
 
+# 호출마다 TCP/TLS 핸드셰이크를 하지 않도록 프로세스 전체에서 연결 풀을 공유합니다.
+# 재시도는 아래 429/503 백오프 로직이 담당하므로 urllib3 자체 재시도는 끕니다.
+_HTTP = (
+    urllib3.PoolManager(
+        maxsize=32,
+        retries=False,
+        timeout=urllib3.Timeout(connect=10, read=30),
+    )
+    if urllib3 is not None
+    else None
+)
+
+# REST 재시도 설정
+# - rate limit(429)과 일시적 서버 오류(5xx)만 재시도합니다.
+# - 대기 시간은 Retry-After 헤더를 우선 따르고, 없으면 full-jitter 지수 백오프를 씁니다.
+#   (여러 워커가 동시에 쿼터에 걸렸을 때 재시도 시점이 겹치지 않도록)
+_REST_MAX_ATTEMPTS = 3
+_RETRYABLE_STATUS = frozenset({429, 500, 502, 503, 504})
+_BACKOFF_BASE_S = 1.0
+_BACKOFF_MAX_S = 30.0
+
+# REST 최종 실패 시 status별 사용자 메시지 (키는 절대 메시지에 포함하지 않음)
+_REST_DEFAULT_ERROR_MESSAGE = "Gemini API 호출이 실패했습니다."
+_REST_ERROR_MESSAGES = {
+    429: (
+        "Gemini API 호출이 429(Quota/Rate limit)으로 실패했습니다. "
+        "현재 키/프로젝트의 할당량이 0이거나 초과된 상태입니다. "
+        "Google AI Studio의 Usage/Rate limit에서 쿼터를 확인하고(필요 시 Billing/플랜 설정), "
+        "올바른 Gemini API Key를 사용해주세요."
+    ),
+    403: (
+        "Gemini API 호출이 403(Permission)으로 실패했습니다. "
+        "API 키 제한(허용 API/리퍼러/IP) 또는 Generative Language API 비활성화 가능성이 큽니다."
+    ),
+    404: (
+        "Gemini API 호출이 404(Not found)로 실패했습니다. "
+        "GEMINI_MODEL 값(모델명)을 확인해주세요."
+    ),
+    400: (
+        "Gemini API 호출이 400(Bad request)로 실패했습니다. "
+        "프롬프트/요청 포맷 또는 generationConfig를 확인해주세요."
+    ),
+}
+
 # Gemini 모델
 _gemini_model = None
 _gemini_model_name: Optional[str] = None
 _gemini_api_key: Optional[str] = None
+_gemini_api_key_masked: str = ""  # 로그용 (init_gemini에서 한 번 계산)
 _use_rest_fallback: bool = False
 
 
@@ -43,22 +104,10 @@ def _get_generation_config() -> _GeminiGenConfig:
     generation 설정을 환경변수로 튜닝 가능하게 제공합니다.
     - 일부 환경에서 SDK 응답이 비정상적으로 짧게 끊기는 경우가 있어 max token을 넉넉히 둡니다.
     """
-    def _get_int(name: str, default: int) -> int:
-        try:
-            return int(os.getenv(name, str(default)))
-        except Exception:
-            return default
-
-    def _get_float(name: str, default: float) -> float:
-        try:
-            return float(os.getenv(name, str(default)))
-        except Exception:
-            return default
-
     return _GeminiGenConfig(
-        temperature=_get_float("GEMINI_TEMPERATURE", 0.7),
-        top_p=_get_float("GEMINI_TOP_P", 0.9),
-        max_output_tokens=_get_int("GEMINI_MAX_OUTPUT_TOKENS", 1024),
+        temperature=load_float_env("GEMINI_TEMPERATURE", 0.7),
+        top_p=load_float_env("GEMINI_TOP_P", 0.9),
+        max_output_tokens=load_int_env("GEMINI_MAX_OUTPUT_TOKENS", 1024),
     )
 
 
@@ -68,10 +117,11 @@ def _looks_truncated(text: str) -> bool:
     - 빈 문자열
     - 괄호/따옴표가 열렸는데 닫히지 않음
     """
-    if not text or not text.strip():
+    s = text.strip() if text else ""
+    if not s:
         return True
-    s = text.strip()
     # 괄호/따옴표 짝이 맞지 않으면 중간 끊김 가능성이 큼
+    # (str.count는 C 레벨 스캔이라, 한 번의 Python 루프/NumPy 변환보다 여러 번 세는 편이 빠릅니다)
     if s.count("(") > s.count(")"):
         return True
     if s.count("[") > s.count("]"):
@@ -94,11 +144,62 @@ def _mask_key(key: str) -> str:
     return f"{key[:3]}***{key[-3:]}"
 
 
-def _rest_generate_content(prompt: str) -> str:
+def _json_dumps(obj) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj).encode("utf-8")
+
+
+def _json_loads(raw: bytes):
+    # orjson.loads는 bytes를 바로 받으므로 별도 UTF-8 decode가 필요 없습니다.
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def _redact_key(text: str) -> str:
+    """예외 메시지 등에 섞인 API 키(요청 URL의 key= 파라미터)를 마스킹 값으로 치환합니다."""
+    if _gemini_api_key and _gemini_api_key in text:
+        return text.replace(_gemini_api_key, _gemini_api_key_masked)
+    return text
+
+
+def _retry_wait_seconds(attempt: int, headers: Mapping[str, str]) -> float:
+    """재시도 전 대기 시간(초). 숫자형 Retry-After가 있으면 그 값을, 없으면 jitter 백오프를 사용합니다."""
+    retry_after = headers.get("Retry-After") if headers else None
+    if retry_after:
+        try:
+            return min(_BACKOFF_MAX_S, max(0.0, float(retry_after)))
+        except ValueError:
+            pass  # HTTP-date 형식은 지원하지 않고 백오프로 대체
+    return random.uniform(0, min(_BACKOFF_MAX_S, _BACKOFF_BASE_S * (2**attempt)))
+
+
+def _http_post_json(url: str, data: bytes) -> Tuple[int, bytes, Mapping[str, str]]:
     """
-    google-generativeai 패키지가 없을 때 REST로 Gemini 호출.
-    - 표준 라이브러리(urllib)만 사용해 추가 의존성 없이 동작합니다.
+    JSON 본문을 POST하고 (status, 응답 본문 bytes, 응답 헤더)를 반환합니다.
+    - urllib3가 있으면 공유 연결 풀(_HTTP)을 재사용하고, 없으면 urllib로 1회성 연결을 엽니다.
+    - HTTP 오류 상태도 예외 대신 status로 돌려주며, 네트워크 오류만 예외로 전파됩니다.
     """
+    headers = {"Content-Type": "application/json"}
+    if _HTTP is not None:
+        resp = _HTTP.request("POST", url, body=data, headers=headers)
+        return resp.status, resp.data, resp.headers
+
+    req = urllib.request.Request(url=url, data=data, method="POST", headers=headers)
+    try:
+        with urllib.request.urlopen(req, timeout=30) as resp:
+            return resp.status, resp.read(), resp.headers
+    except urllib.error.HTTPError as e:
+        try:
+            body = e.read()
+        except Exception:
+            body = b""
+        return e.code, body, e.headers
+
+
+def _rest_request(prompt: str) -> Tuple[str, bytes]:
+    """REST generateContent 호출용 (url, JSON 본문 bytes)를 만듭니다."""
     if not _gemini_api_key or not _gemini_model_name:
         raise RuntimeError("Gemini REST 호출에 필요한 설정이 없습니다. GEMINI_API_KEY/GEMINI_MODEL을 확인해주세요.")
 
@@ -118,75 +219,46 @@ def _rest_generate_content(prompt: str) -> str:
             "maxOutputTokens": cfg.max_output_tokens,
         },
     }
+    return url, _json_dumps(payload)
 
-    data = json.dumps(payload).encode("utf-8")
-    req = urllib.request.Request(
-        url=url,
-        data=data,
-        method="POST",
-        headers={"Content-Type": "application/json"},
-    )
 
-    last_http_error: Optional[urllib.error.HTTPError] = None
-    # 429/503 등 일시적 오류는 짧게 재시도
-    for attempt in range(3):
+def _rest_generate_content(prompt: str) -> str:
+    """
+    google-generativeai 패키지가 없을 때 REST로 Gemini 호출.
+    - urllib3가 있으면 연결 풀을 재사용하고, 없으면 표준 라이브러리(urllib)만으로 동작합니다.
+    """
+    url, data = _rest_request(prompt)
+
+    # 429/5xx 등 일시적 오류는 짧게 재시도
+    # (이 함수는 generate_gemini에서 스레드로 실행되므로 time.sleep이 이벤트 루프를 막지 않습니다)
+    for attempt in range(_REST_MAX_ATTEMPTS):
         try:
-            with urllib.request.urlopen(req, timeout=30) as resp:
-                raw = resp.read().decode("utf-8")
-                break
-        except urllib.error.HTTPError as e:
-            last_http_error = e
-            body = ""
-            try:
-                body = e.read().decode("utf-8")
-            except Exception:
-                body = ""
-
-            # rate limit / 일시 장애는 백오프 후 재시도
-            if e.code in (429, 503) and attempt < 2:
-                wait_s = 1.0 * (2**attempt)
-                logger.warning(f"Gemini REST 일시 오류(status={e.code}) → {wait_s:.1f}s 후 재시도")
-                time.sleep(wait_s)
-                continue
-
-            # 최종 실패: 원인별로 메시지 분기 (키는 절대 로그/메시지에 포함하지 않음)
-            msg = "Gemini API 호출이 실패했습니다."
-            if e.code == 429:
-                msg = (
-                    "Gemini API 호출이 429(Quota/Rate limit)으로 실패했습니다. "
-                    "현재 키/프로젝트의 할당량이 0이거나 초과된 상태입니다. "
-                    "Google AI Studio의 Usage/Rate limit에서 쿼터를 확인하고(필요 시 Billing/플랜 설정), "
-                    "올바른 Gemini API Key를 사용해주세요."
-                )
-            elif e.code == 403:
-                msg = (
-                    "Gemini API 호출이 403(Permission)으로 실패했습니다. "
-                    "API 키 제한(허용 API/리퍼러/IP) 또는 Generative Language API 비활성화 가능성이 큽니다."
-                )
-            elif e.code == 404:
-                msg = (
-                    "Gemini API 호출이 404(Not found)로 실패했습니다. "
-                    "GEMINI_MODEL 값(모델명)을 확인해주세요."
-                )
-            elif e.code == 400:
-                msg = (
-                    "Gemini API 호출이 400(Bad request)로 실패했습니다. "
-                    "프롬프트/요청 포맷 또는 generationConfig를 확인해주세요."
-                )
-
-            logger.error(f"Gemini REST HTTPError: status={e.code}, body={body[:500]}")
-            raise RuntimeError(msg) from e
+            status, raw, headers = _http_post_json(url, data)
         except Exception as e:
-            logger.error(f"Gemini REST 호출 실패: {str(e)}")
+            # urllib3 예외 메시지에는 요청 URL(key 포함)이 들어갈 수 있으므로 마스킹
+            logger.error(f"Gemini REST 호출 실패: {_redact_key(str(e))}")
             raise RuntimeError("Gemini API 호출 중 오류가 발생했습니다.") from e
-    else:
-        # for-else 방지용 (실제로는 위에서 raise/continue 처리)
-        raise RuntimeError("Gemini API 호출이 실패했습니다.") from last_http_error
+
+        if status < 400:
+            break
+
+        # rate limit / 일시 장애는 백오프 후 재시도
+        if status in _RETRYABLE_STATUS and attempt < _REST_MAX_ATTEMPTS - 1:
+            wait_s = _retry_wait_seconds(attempt, headers)
+            logger.warning(f"Gemini REST 일시 오류(status={status}) → {wait_s:.1f}s 후 재시도")
+            time.sleep(wait_s)
+            continue
+
+        # 최종 실패: 원인별로 메시지 분기 (키는 절대 로그/메시지에 포함하지 않음)
+        msg = _REST_ERROR_MESSAGES.get(status, _REST_DEFAULT_ERROR_MESSAGE)
+
+        logger.error(f"Gemini REST HTTPError: status={status}, body={raw[:500].decode('utf-8', errors='replace')}")
+        raise RuntimeError(msg)
 
     try:
-        obj = json.loads(raw)
+        obj = _json_loads(raw)
     except Exception as e:
-        logger.error(f"Gemini REST 응답 JSON 파싱 실패: {raw[:500]}")
+        logger.error(f"Gemini REST 응답 JSON 파싱 실패: {raw[:500].decode('utf-8', errors='replace')}")
         raise RuntimeError("Gemini API 응답을 처리하지 못했습니다.") from e
 
     # 응답 스키마: candidates[0].content.parts[0].text
@@ -210,7 +282,7 @@ def _rest_generate_content(prompt: str) -> str:
 
 def init_gemini():
     """Gemini API 초기화"""
-    global _gemini_model, _gemini_model_name, _gemini_api_key, _use_rest_fallback
+    global _gemini_model, _gemini_model_name, _gemini_api_key, _gemini_api_key_masked, _use_rest_fallback
 
     if _gemini_model is not None:
         logger.info("Gemini 모델 이미 초기화됨")
@@ -220,6 +292,7 @@ def init_gemini():
     # 모델명은 환경변수로 관리 (기본값은 라이트 모델로 설정)
     model_name = os.getenv("GEMINI_MODEL", "gemini-2.5-flash-lite")
     _gemini_api_key = api_key
+    _gemini_api_key_masked = _mask_key(api_key or "")
     _gemini_model_name = model_name
     
     if not api_key:
@@ -232,7 +305,7 @@ def init_gemini():
         _use_rest_fallback = True
         logger.warning("google-generativeai 패키지가 설치되지 않았습니다")
         logger.warning("SDK 대신 REST 폴백으로 Gemini를 사용합니다")
-        logger.info(f"Gemini REST 폴백 준비 완료 (model={model_name}, key={_mask_key(api_key)})")
+        logger.info(f"Gemini REST 폴백 준비 완료 (model={model_name}, key={_gemini_api_key_masked})")
         return
 
     try:
@@ -251,6 +324,8 @@ def init_gemini():
 async def generate_gemini(prompt: str) -> str:
     """
     Gemini API로 텍스트 생성
+    - SDK/REST 호출은 모두 블로킹이므로 스레드에서 실행해 이벤트 루프를 막지 않습니다.
+      (동시 요청이 한 워커에서 직렬화되지 않도록)
     
     Args:
         prompt: 입력 프롬프트
@@ -258,6 +333,11 @@ async def generate_gemini(prompt: str) -> str:
     Returns:
         생성된 텍스트
     """
+    return await asyncio.to_thread(_generate_gemini_sync, prompt)
+
+
+def _generate_gemini_sync(prompt: str) -> str:
+    """generate_gemini의 동기 본체 (SDK 1차 시도 → 필요 시 REST 폴백)"""
     # SDK가 없거나 초기화 실패 시 REST 폴백 사용
     if _use_rest_fallback or genai is None or _gemini_model is None:
         return _rest_generate_content(prompt)
@@ -304,6 +384,14 @@ async def generate_gemini(prompt: str) -> str:
         raise RuntimeError("Gemini API 호출 중 오류가 발생했습니다.") from e
 
 
+def gemini_cache_namespace() -> str:
+    """응답 캐시 키에 포함할 모델명 + 생성 설정 (설정이 바뀌면 캐시가 섞이지 않도록)"""
+    cfg = _get_generation_config()
+    return (
+        f"gemini|{_gemini_model_name}|{cfg.temperature}|{cfg.top_p}|{cfg.max_output_tokens}"
+    )
+
+
 def is_gemini_available() -> bool:
     """Gemini API 사용 가능 여부 확인"""
     # SDK든 REST든, 최소한 API 키가 있어야 사용 가능
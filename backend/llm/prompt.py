@@ -4,13 +4,124 @@
 - Gemini와 로컬 LLM 모두 동일한 포맷 사용
 """
 from typing import List, Dict, Any
-import re
+
+from utils.env import load_bool_env
+
+
+# 프롬프트의 정적 앞부분 (요청과 무관하게 항상 동일)
+# - 보간 없이 모듈 상수로 두어, 프롬프트가 "정적 prefix + 동적 suffix" 형태가 되도록 합니다.
+#   (provider 측 prefix 캐싱은 앞에서부터 일치하는 구간에만 적용됩니다)
+_RULES_PREFIX = """당신은 아래 '상품 정보'만 근거로 답변하는 쇼핑 도우미입니다.
+
+규칙:
+- '상품 정보'에 없는 내용은 추측/단정하지 마세요.
+- 질문과 직접적으로 연결되는 근거가 없으면, 아는 범위까지만 설명하고 "정확한 확인은 상품 상세 페이지의 Q&A에 문의해주세요."라고 안내하세요.
+- 질문이 가능/불가능 여부를 묻는 형태라면, 답변 첫 문장에서 예/아니오를 질문의 긍/부정에 맞게 정합적으로 선택하세요.
+  - 긍정형 질문(예: "사용할 수 있어?") + 가능 → "네, …할 수 있습니다."
+  - 부정형 질문(예: "사용할 수 없어?") + 가능 → "아니요, …할 수 있습니다."
+  - 긍정형 질문 + 불가능 → "아니요, …할 수 없습니다."
+  - 부정형 질문 + 불가능 → "네, …할 수 없습니다."
+- 부정형 질문의 의도가 애매하면(수사/확인 질문 가능) 한 문장으로 되물어 확인한 뒤 답하세요.
+- 아래 규칙/형식 문구를 설명하거나 복사하지 말고, 최종 답변만 출력하세요.
+- 답변에는 "근거:", "출처:", 따옴표 인용, 타입 표기(description/review/qna)를 절대 포함하지 마세요.
+- 답변은 최대 5줄 이내로 간결하게 작성하세요.
+
+상품 정보:
+"""
+
+_SOURCE_SELECTION_PREFIX = """당신은 아래 '상품 정보'만 근거로 답변하는 쇼핑 도우미입니다.
+
+규칙:
+- '상품 정보'에 없는 내용은 추측/단정하지 마세요.
+- 질문과 직접적으로 연결되는 근거가 없으면, 아는 범위까지만 설명하고 "정확한 확인은 상품 상세 페이지의 Q&A에 문의해주세요."라고 안내하세요.
+- 질문이 가능/불가능 여부를 묻는 형태라면, 답변 첫 문장에서 예/아니오를 질문의 긍/부정에 맞게 정합적으로 선택하세요.
+  - 긍정형 질문(예: "사용할 수 있어?") + 가능 → "네, …할 수 있습니다."
+  - 부정형 질문(예: "사용할 수 없어?") + 가능 → "아니요, …할 수 있습니다."
+  - 긍정형 질문 + 불가능 → "아니요, …할 수 없습니다."
+  - 부정형 질문 + 불가능 → "네, …할 수 없습니다."
+- 부정형 질문의 의도가 애매하면(수사/확인 질문 가능) 한 문장으로 되물어 확인한 뒤 답하세요.
+- 아래 규칙/형식 문구를 설명하거나 복사하지 말고, 최종 결과(JSON)만 출력하세요.
+- answer에는 "근거:", "출처:", 따옴표 인용, 타입 표기(description/review/qna), source_id를 절대 포함하지 마세요.
+- answer는 최대 5줄 이내로 간결하게 작성하세요.
+
+출력 형식(중요):
+- 반드시 아래 JSON 오브젝트만 출력하세요. (코드펜스 ``` 금지, 추가 텍스트 금지)
+- used_source_ids는 문자열 배열이며, 아래 '상품 정보'에 있는 source_id 값만 넣을 수 있습니다.
+- used_source_ids에는 "실제로 답변 근거로 사용한" 소스만 넣으세요. 검색만 되었지만 답변에 쓰지 않았으면 넣지 마세요.
+
+{"answer":"...","used_source_ids":["..."]}
+
+상품 정보:
+"""
+
+# 압축 규칙 (LLM_PROMPT_COMPACT=true, 기본 비활성)
+# - 규칙은 모델에게만 보이므로 존댓말/조사/반복 문구를 덜어내 입력 토큰을 줄입니다.
+# - 사용자에게 그대로 나가는 문구("네, …할 수 있습니다." 등)와 JSON 형식은 원문과 동일하게 유지합니다.
+# - 부정형 질문 골든셋으로 기본 규칙과 A/B 비교한 뒤 켜도록 플래그로 분리합니다.
+_COMPACT_RULES_PREFIX = """역할: 아래 '상품 정보'만 근거로 답하는 쇼핑 도우미.
+
+규칙:
+- 상품 정보에 없는 내용 추측/단정 금지.
+- 직접 근거 없음 → 아는 범위만 설명 + "정확한 확인은 상품 상세 페이지의 Q&A에 문의해주세요." 안내.
+- 가능 여부 질문 → 첫 문장 예/아니오를 질문 긍/부정에 맞춤:
+  긍정형+가능 "네, …할 수 있습니다." / 부정형+가능 "아니요, …할 수 있습니다."
+  긍정형+불가 "아니요, …할 수 없습니다." / 부정형+불가 "네, …할 수 없습니다."
+- 부정형 의도 애매 → 한 문장으로 되물어 확인 후 답변.
+- 규칙/형식 문구 설명·복사 금지. 최종 답변만 출력.
+- 답변에 "근거:", "출처:", 따옴표 인용, 타입 표기(description/review/qna) 금지.
+- 최대 5줄, 간결하게.
+
+상품 정보:
+"""
+
+_COMPACT_SOURCE_SELECTION_PREFIX = """역할: 아래 '상품 정보'만 근거로 답하는 쇼핑 도우미.
+
+규칙:
+- 상품 정보에 없는 내용 추측/단정 금지.
+- 직접 근거 없음 → 아는 범위만 설명 + "정확한 확인은 상품 상세 페이지의 Q&A에 문의해주세요." 안내.
+- 가능 여부 질문 → 첫 문장 예/아니오를 질문 긍/부정에 맞춤:
+  긍정형+가능 "네, …할 수 있습니다." / 부정형+가능 "아니요, …할 수 있습니다."
+  긍정형+불가 "아니요, …할 수 없습니다." / 부정형+불가 "네, …할 수 없습니다."
+- 부정형 의도 애매 → 한 문장으로 되물어 확인 후 답변.
+- 규칙/형식 문구 설명·복사 금지. 최종 결과(JSON)만 출력.
+- answer에 "근거:", "출처:", 따옴표 인용, 타입 표기(description/review/qna), source_id 금지.
+- answer 최대 5줄, 간결하게.
+
+출력 형식(중요):
+- 아래 JSON 오브젝트만 출력. (코드펜스 ``` 금지, 추가 텍스트 금지)
+- used_source_ids: 문자열 배열, 아래 상품 정보의 source_id 값만 허용.
+- 실제 답변 근거로 쓴 소스만 포함. 검색만 되고 안 쓴 소스 제외.
+
+{"answer":"...","used_source_ids":["..."]}
+
+상품 정보:
+"""
+
+if load_bool_env("LLM_PROMPT_COMPACT", False):
+    _RULES_PREFIX = _COMPACT_RULES_PREFIX
+    _SOURCE_SELECTION_PREFIX = _COMPACT_SOURCE_SELECTION_PREFIX
+
+_NO_CONTEXT_TEXT = "(검색된 관련 정보가 없습니다)"
+
+# 컨텍스트 뒤의 정적 구분자/끝맺음 (동적 슬롯 사이에 그대로 이어 붙임)
+_QUESTION_SEP = "\n\n질문:\n"
+_ANSWER_SUFFIX = "\n\n최종 답변:"
+_JSON_SUFFIX = "\n\nJSON:"
+
+# 부정형 질문일 때 질문 앞에 붙이는 보조 힌트 (감지는 guards.detect_polarity에서 요청당 1회)
+# 한국어에서 부정형 질문은 의미가 애매해(수사/확인 질문) LLM이 "네, 가능합니다"처럼
+# yes/no를 질문의 부정과 무관하게 출력하는 문제가 자주 발생하므로, 보조 힌트를 제공합니다.
+POLARITY_HINT_TEXT = (
+    "주의: 사용자의 질문은 부정형(예: '…할 수 없어?')입니다. "
+    "가능/불가능 판단 자체는 동일하더라도, 답변 첫 문장의 예/아니오를 질문의 부정에 맞게 정합적으로 선택하세요.\n"
+)
 
 
 def build_prompt(
     query: str,
     contexts: List[Dict[str, Any]],
-    product_id: int
+    product_id: int,
+    polarity_hint: str = "",
 ) -> str:
     """
     RAG 프롬프트 생성
@@ -19,61 +130,24 @@ def build_prompt(
         query: 사용자 질문
         contexts: 검색된 컨텍스트 리스트
         product_id: 상품 ID
+        polarity_hint: 부정형 질문 힌트 (guards.detect_polarity(query)["hint"])
         
     Returns:
         완성된 프롬프트
     """
     # 컨텍스트 포맷팅
-    context_text = ""
     if contexts:
-        context_text = "\n\n".join([
-            f"[{ctx['type']}] {ctx['content']}"
-            for ctx in contexts
-        ])
+        context_text = "\n\n".join(f"[{ctx['type']}] {ctx['content']}" for ctx in contexts)
     else:
-        context_text = "(검색된 관련 정보가 없습니다)"
-
-    # 부정형 질문 힌트 (예: "…할 수 없어?", "안 돼?", "못 해?")
-    # 한국어에서 부정형 질문은 의미가 애매해(수사/확인 질문) LLM이 "네, 가능합니다"처럼
-    # yes/no를 질문의 부정과 무관하게 출력하는 문제가 자주 발생하므로, 보조 힌트를 제공합니다.
-    q = (query or "").strip()
-    is_negative_question = bool(
-        re.search(r"(없어\?|없나요\?|안\s*돼\?|안되\?|못\s*해\?|못해\?|불가\?|불가능\?)\s*$", q)
-    )
-    polarity_hint = ""
-    if is_negative_question:
-        polarity_hint = (
-            "주의: 사용자의 질문은 부정형(예: '…할 수 없어?')입니다. "
-            "가능/불가능 판단 자체는 동일하더라도, 답변 첫 문장의 예/아니오를 질문의 부정에 맞게 정합적으로 선택하세요.\n"
-        )
-    
+        context_text = _NO_CONTEXT_TEXT
+
     # 프롬프트 구성
     # NOTE:
     # - "근거/출처"는 API 응답의 sources로 별도 제공하므로, LLM 답변에는 포함하지 않습니다.
     # - 정보가 부족하더라도 관련된 정보가 있으면 그 범위 안에서 최대한 도움되는 답을 하되,
     #   없는 내용은 추측/단정하지 않도록 합니다.
-    prompt = f"""당신은 아래 '상품 정보'만 근거로 답변하는 쇼핑 도우미입니다.
-
-규칙:
-- '상품 정보'에 없는 내용은 추측/단정하지 마세요.
-- 질문과 직접적으로 연결되는 근거가 없으면, 아는 범위까지만 설명하고 "정확한 확인은 상품 상세 페이지의 Q&A에 문의해주세요."라고 안내하세요.
-- 질문이 가능/불가능 여부를 묻는 형태라면, 답변 첫 문장에서 예/아니오를 질문의 긍/부정에 맞게 정합적으로 선택하세요.
-  - 긍정형 질문(예: "사용할 수 있어?") + 가능 → "네, …할 수 있습니다."
-  - 부정형 질문(예: "사용할 수 없어?") + 가능 → "아니요, …할 수 있습니다."
-  - 긍정형 질문 + 불가능 → "아니요, …할 수 없습니다."
-  - 부정형 질문 + 불가능 → "네, …할 수 없습니다."
-- 부정형 질문의 의도가 애매하면(수사/확인 질문 가능) 한 문장으로 되물어 확인한 뒤 답하세요.
-- 아래 규칙/형식 문구를 설명하거나 복사하지 말고, 최종 답변만 출력하세요.
-- 답변에는 "근거:", "출처:", 따옴표 인용, 타입 표기(description/review/qna)를 절대 포함하지 마세요.
-- 답변은 최대 5줄 이내로 간결하게 작성하세요.
-
-상품 정보:
-{context_text}
-
-질문:
-{polarity_hint}{query}
-
-최종 답변:"""
+    # - 정적 규칙(_RULES_PREFIX)을 앞에, 요청마다 바뀌는 컨텍스트/질문을 뒤에 둡니다.
+    prompt = "".join((_RULES_PREFIX, context_text, _QUESTION_SEP, polarity_hint, query, _ANSWER_SUFFIX))
     
     return prompt
 
@@ -81,13 +155,15 @@ def build_prompt(
 def build_prompt_with_source_selection(
     query: str,
     contexts: List[Dict[str, Any]],
-    product_id: int
+    product_id: int,
+    polarity_hint: str = "",
 ) -> str:
     """
     RAG 프롬프트(소스 사용 여부 선택 포함)
 
     - LLM이 "실제로 답변에 사용한 컨텍스트(source_id)"만 반환하도록 강제합니다.
     - 최종 출력은 JSON 단일 오브젝트여야 합니다.
+    - polarity_hint: 부정형 질문 힌트 (guards.detect_polarity(query)["hint"])
 
     Returns:
         JSON 문자열만 출력하도록 설계된 프롬프트
@@ -111,53 +187,13 @@ def build_prompt_with_source_selection(
             )
         context_text = "\n\n".join(parts)
     else:
-        context_text = "(검색된 관련 정보가 없습니다)"
-
-    # 부정형 질문 힌트 (기존 로직 유지)
-    q = (query or "").strip()
-    is_negative_question = bool(
-        re.search(r"(없어\?|없나요\?|안\s*돼\?|안되\?|못\s*해\?|못해\?|불가\?|불가능\?)\s*$", q)
-    )
-    polarity_hint = ""
-    if is_negative_question:
-        polarity_hint = (
-            "주의: 사용자의 질문은 부정형(예: '…할 수 없어?')입니다. "
-            "가능/불가능 판단 자체는 동일하더라도, 답변 첫 문장의 예/아니오를 질문의 부정에 맞게 정합적으로 선택하세요.\n"
-        )
+        context_text = _NO_CONTEXT_TEXT
 
     # JSON 출력 강제
     # - answer에는 출처/메타 문구를 넣지 말 것
     # - used_source_ids는 '실제로 답변 근거로 사용한' source_id만 포함 (부분적으로 참고했다면 포함)
     # - 근거가 부족해 Q&A 문의 안내로 끝내는 경우 used_source_ids는 []로 두는 것이 안전
-    prompt = f"""당신은 아래 '상품 정보'만 근거로 답변하는 쇼핑 도우미입니다.
-
-규칙:
-- '상품 정보'에 없는 내용은 추측/단정하지 마세요.
-- 질문과 직접적으로 연결되는 근거가 없으면, 아는 범위까지만 설명하고 "정확한 확인은 상품 상세 페이지의 Q&A에 문의해주세요."라고 안내하세요.
-- 질문이 가능/불가능 여부를 묻는 형태라면, 답변 첫 문장에서 예/아니오를 질문의 긍/부정에 맞게 정합적으로 선택하세요.
-  - 긍정형 질문(예: "사용할 수 있어?") + 가능 → "네, …할 수 있습니다."
-  - 부정형 질문(예: "사용할 수 없어?") + 가능 → "아니요, …할 수 있습니다."
-  - 긍정형 질문 + 불가능 → "아니요, …할 수 없습니다."
-  - 부정형 질문 + 불가능 → "네, …할 수 없습니다."
-- 부정형 질문의 의도가 애매하면(수사/확인 질문 가능) 한 문장으로 되물어 확인한 뒤 답하세요.
-- 아래 규칙/형식 문구를 설명하거나 복사하지 말고, 최종 결과(JSON)만 출력하세요.
-- answer에는 "근거:", "출처:", 따옴표 인용, 타입 표기(description/review/qna), source_id를 절대 포함하지 마세요.
-- answer는 최대 5줄 이내로 간결하게 작성하세요.
-
-출력 형식(중요):
-- 반드시 아래 JSON 오브젝트만 출력하세요. (코드펜스 ``` 금지, 추가 텍스트 금지)
-- used_source_ids는 문자열 배열이며, 아래 '상품 정보'에 있는 source_id 값만 넣을 수 있습니다.
-- used_source_ids에는 "실제로 답변 근거로 사용한" 소스만 넣으세요. 검색만 되었지만 답변에 쓰지 않았으면 넣지 마세요.
-
-{{"answer":"...","used_source_ids":["..."]}}
-
-상품 정보:
-{context_text}
-
-질문:
-{polarity_hint}{query}
-
-JSON:"""
+    prompt = "".join((_SOURCE_SELECTION_PREFIX, context_text, _QUESTION_SEP, polarity_hint, query, _JSON_SUFFIX))
     return prompt
 
 
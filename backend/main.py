@@ -7,12 +7,16 @@ FastAPI 메인 애플리케이션 엔트리포인트
 from dotenv import load_dotenv
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from contextlib import asynccontextmanager
+import asyncio
 import logging
 
 from api import products, chat
-from db.database import init_db
+from db.database import close_connections, init_db
 from llm.engine import init_llm_engines
+from rag.embedder import init_embedder
+from rag.vector_store import init_chroma
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -48,19 +52,29 @@ async def lifespan(app: FastAPI):
     
     # 2. LLM 엔진 초기화 (Gemini)
     logger.info("LLM 엔진 초기화 중...")
-    await init_llm_engines()
+    init_llm_engines()
+
+    # 3. 벡터 스토어 핸들 + 임베딩 모델 로드
+    # - 첫 채팅 요청이 모델 로드/컬렉션 오픈 비용을 떠안지 않도록 시작 시 한 번 준비합니다.
+    # - 인덱싱은 하지 않습니다. (worker.rag_index 담당)
+    logger.info("벡터 스토어/임베딩 모델 초기화 중...")
+    await asyncio.to_thread(init_chroma)
+    await asyncio.to_thread(init_embedder)
 
     logger.info("애플리케이션 준비 완료")
     yield
     
     logger.info("애플리케이션 종료 중...")
+    close_connections()
 
 
 app = FastAPI(
     title="RAG 챗봇 API",
     description="상품 데이터 기반 RAG 검색 + LLM 챗봇 API",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    # 응답 직렬화를 orjson(C 구현)으로 처리합니다. (sources[].content 등 긴 문자열이 많음)
+    default_response_class=ORJSONResponse,
 )
 
 # CORS 설정 (프론트엔드에서 접근 가능하도록)
@@ -3,8 +3,7 @@
 - 긴 텍스트를 적절한 크기로 분할
 - 오버랩을 두어 문맥 유지
 """
-from typing import List, Dict, Any
-import re
+from typing import Any, Dict, Iterable, Iterator, List
 
 
 def chunk_text(
@@ -23,8 +22,9 @@ def chunk_text(
     Returns:
         청크 리스트
     """
-    # 공백 정리
-    text = re.sub(r'\s+', ' ', text).strip()
+    # 공백 정리 (연속 공백 → 한 칸, 양끝 제거)
+    # str.split()은 정규식 \s+와 같은 유니코드 공백 기준이면서 C 레벨 한 번의 스캔이라 더 빠릅니다.
+    text = " ".join(text.split())
     
     if len(text) <= chunk_size:
         return [text]
@@ -53,7 +53,12 @@ def chunk_text(
             chunks.append(chunk)
         
         # 다음 청크 시작 위치 (오버랩 고려)
-        start = end - chunk_overlap
+        next_start = end - chunk_overlap
+        # 잘린 청크 길이가 오버랩과 같으면 다음 시작점이 제자리가 되어 같은 청크를 끝없이
+        # 반복하게 되므로, 이때는 오버랩 없이 다음 위치로 넘어갑니다.
+        if 0 < next_start == start:
+            next_start = end
+        start = next_start
         
         # 무한 루프 방지
         if start <= 0 or start >= len(text):
@@ -63,35 +68,32 @@ def chunk_text(
 
 
 def chunk_product_texts(
-    product_texts: List[Dict[str, Any]],
+    product_texts: Iterable[Any],
     chunk_size: int = 500,
     chunk_overlap: int = 50
-) -> List[Dict[str, Any]]:
+) -> Iterator[Dict[str, Any]]:
     """
     상품 텍스트 리스트를 청크로 분할
+    - 청크를 리스트로 모으지 않고 하나씩 yield합니다. (전체 재인덱싱 시 메모리 사용량을 일정하게 유지)
     
     Args:
-        product_texts: 상품 텍스트 리스트 (DB에서 조회한 데이터)
+        product_texts: 상품 텍스트 리스트/이터레이터 (DB에서 조회한 ProductText 행: id, product_id, type, content)
         chunk_size: 청크 크기
         chunk_overlap: 청크 간 오버랩
         
-    Returns:
-        청크 리스트 (메타데이터 포함)
+    Yields:
+        청크 (메타데이터 포함)
     """
-    chunked_data = []
-    
     for text_data in product_texts:
-        content = text_data["content"]
+        content = text_data.content
         chunks = chunk_text(content, chunk_size, chunk_overlap)
         
         for i, chunk in enumerate(chunks):
-            chunked_data.append({
+            yield {
                 "content": chunk,
-                "product_id": text_data["product_id"],
-                "type": text_data["type"],
-                "original_id": text_data["id"],
+                "product_id": text_data.product_id,
+                "type": text_data.type,
+                "original_id": text_data.id,
                 "chunk_index": i
-            })
-    
-    return chunked_data
+            }
 
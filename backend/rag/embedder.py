@@ -1,32 +1,176 @@
 """
 임베딩 생성 모듈
 - sentence-transformers를 사용한 로컬 임베딩
+- (선택) EMBEDDING_ONNX_PATH를 지정하면 ONNX Runtime 세션으로 같은 모델을 추론
 - 추후 Jina/Gemini embeddings로 교체 가능하도록 인터페이스 분리
 """
-from typing import List
+from concurrent.futures import Future
+from contextlib import nullcontext
+from functools import lru_cache
+from typing import Dict, List, Tuple
 import logging
+import os
+import threading
+
+import numpy as np
 from sentence_transformers import SentenceTransformer
 
+from utils.env import load_bool_env, load_float_env, load_int_env
+
+# onnxruntime은 선택 의존성입니다. 없으면 sentence-transformers(PyTorch)로 동작합니다.
+try:
+    import onnxruntime  # type: ignore
+except Exception:  # pragma: no cover
+    onnxruntime = None  # type: ignore
+
 logger = logging.getLogger(__name__)
 
 # 전역 임베딩 모델 (앱 시작 시 한 번만 로드)
 _embedding_model = None
+# 첫 요청들이 동시에 들어와도 모델을 한 번만 로드하도록 보호합니다.
+_init_lock = threading.Lock()
+
+
+# 단일 질문 임베딩 LRU 크기 (추천 질문 클릭/재시도 등 같은 질문이 반복되는 경우가 많음)
+_QUERY_CACHE_MAX_ENTRIES = load_int_env("EMBEDDING_QUERY_CACHE_MAX_ENTRIES", 1024)
+
+# ONNX로 export한 임베딩 모델 디렉터리 (model.onnx + 토크나이저 파일)
+# 예) optimum-cli export onnx --model sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2 <dir>
+_ONNX_MODEL_DIR = os.getenv("EMBEDDING_ONNX_PATH", "")
+
+# 임베딩 모델 Linear 가중치를 INT8로 동적 양자화할지 여부 (CPU 추론 전용, 기본 비활성)
+# NOTE: 인덱싱(워커)과 조회(API)가 같은 설정을 써야 임베딩 공간이 어긋나지 않습니다.
+#       설정을 바꿨다면 재인덱싱하세요.
+_QUANTIZE_INT8 = load_bool_env("EMBEDDING_QUANTIZE", False)
+
+# 임베딩 추론 스레드 수 (0이면 라이브러리 기본값). 인덱싱 워커처럼 대량 임베딩만 하는 프로세스에서
+# 코어 수에 맞춰 올리면 인코딩 처리량이 늘어납니다.
+_NUM_THREADS = max(0, load_int_env("EMBEDDING_NUM_THREADS", 0))
+
+# 동시 요청의 단일 질문 임베딩을 모아 한 번의 encode로 처리하는 대기 창(ms). 0이면 배칭하지 않습니다.
+_BATCH_WINDOW_S = max(0.0, load_float_env("EMBEDDING_BATCH_WINDOW_MS", 5.0)) / 1000.0
+
+# 한 번의 encode로 묶는 최대 질문 수. 대기 창 안이라도 이만큼 모이면 바로 인코딩합니다.
+_BATCH_MAX_SIZE = max(1, load_int_env("EMBEDDING_BATCH_MAX_SIZE", 32))
+
+# 합류 중인 배치의 (텍스트, 결과 future) 목록과, 배치가 가득 찼음을 리더에게 알리는 이벤트
+# - 가득 찬 배치는 새 목록으로 교체되어 떼어지므로, 이후 호출자는 다음 배치(새 리더)로 들어갑니다.
+_pending: List[Tuple[str, "Future[np.ndarray]"]] = []
+_pending_full = threading.Event()
+_pending_lock = threading.Lock()
 
 
 def init_embedder():
     """임베딩 모델 초기화"""
     global _embedding_model
     
-    if _embedding_model is None:
+    if _embedding_model is not None:
+        return _embedding_model
+
+    with _init_lock:
+        if _embedding_model is not None:
+            return _embedding_model
         logger.info("임베딩 모델 로드 중...")
         # 한국어 지원이 좋은 multilingual 모델 사용
         model_name = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
-        _embedding_model = SentenceTransformer(model_name)
+        if _ONNX_MODEL_DIR and onnxruntime is not None:
+            model = _OnnxEmbedder(_ONNX_MODEL_DIR)
+            model_name = f"{model_name} (onnx: {_ONNX_MODEL_DIR})"
+        else:
+            if _ONNX_MODEL_DIR:
+                logger.warning("onnxruntime 패키지가 없어 EMBEDDING_ONNX_PATH를 무시하고 PyTorch 모델을 사용합니다")
+            if _NUM_THREADS:
+                import torch
+
+                torch.set_num_threads(_NUM_THREADS)
+            model = SentenceTransformer(model_name)
+            model.eval()  # 추론 전용 (dropout 등 비활성)
+            if _QUANTIZE_INT8:
+                model = _quantize_int8(model)
+        clear_embedding_cache()  # 이전 모델로 만든 임베딩이 섞이지 않도록
+        # 다른 스레드가 로드 중인 모델을 보지 않도록, 준비가 끝난 뒤에 전역에 게시합니다.
+        _embedding_model = model
         logger.info(f"임베딩 모델 로드 완료: {model_name}")
     
     return _embedding_model
 
 
+def _inference_mode():
+    """
+    PyTorch 모델이면 torch.inference_mode() 컨텍스트를 반환합니다. (ONNX 모델이면 no-op)
+    - no_grad보다 강하게 autograd 추적(버전 카운터/뷰 추적)을 끕니다.
+    - grad 모드는 스레드별 상태라 시작 시 한 번 끄는 대신, encode를 호출하는 스레드에서 매번 감쌉니다.
+    """
+    if isinstance(_embedding_model, _OnnxEmbedder):
+        return nullcontext()
+    import torch
+
+    return torch.inference_mode()
+
+
+class _OnnxEmbedder:
+    """
+    SentenceTransformer.encode와 같은 결과(토큰 임베딩 mean pooling)를 ONNX Runtime으로 계산합니다.
+    - 모델 그래프는 fused kernel로 실행되고, 토크나이징은 HF fast tokenizer(Rust)가 담당합니다.
+    - paraphrase-multilingual-MiniLM-L12-v2는 정규화 레이어가 없으므로 pooling 결과를 그대로 반환합니다.
+    """
+
+    # sentence-transformers 설정(max_seq_length)과 동일하게 자릅니다.
+    max_seq_length = 128
+
+    def __init__(self, model_dir: str):
+        from transformers import AutoTokenizer
+
+        self._tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        options = onnxruntime.SessionOptions()
+        if _NUM_THREADS:
+            options.intra_op_num_threads = _NUM_THREADS
+        self._session = onnxruntime.InferenceSession(
+            os.path.join(model_dir, "model.onnx"),
+            sess_options=options,
+            providers=["CPUExecutionProvider"],
+        )
+        self._input_names = {i.name for i in self._session.get_inputs()}
+
+    def encode(self, texts: List[str], batch_size: int = 32, **_: object) -> np.ndarray:
+        outputs = []
+        for start in range(0, len(texts), batch_size):
+            enc = self._tokenizer(
+                texts[start:start + batch_size],
+                padding=True,
+                truncation=True,
+                max_length=self.max_seq_length,
+                return_tensors="np",
+            )
+            feeds = {k: v.astype(np.int64) for k, v in enc.items() if k in self._input_names}
+            token_embeddings = self._session.run(None, feeds)[0]  # (batch, seq, dim)
+            mask = enc["attention_mask"][..., None].astype(np.float32)
+            summed = (token_embeddings * mask).sum(axis=1)
+            outputs.append(summed / np.clip(mask.sum(axis=1), 1e-9, None))
+        if not outputs:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.concatenate(outputs).astype(np.float32, copy=False)
+
+
+def _quantize_int8(model):
+    """
+    Linear 레이어를 INT8 동적 양자화합니다. (가중치 메모리/대역폭 1/4, CPU int8 내적 커널 사용)
+    - GPU에 올라간 모델이거나 양자화에 실패하면 FP32 모델을 그대로 사용합니다.
+    """
+    try:
+        import torch
+
+        if model.device.type != "cpu":
+            logger.warning("임베딩 INT8 양자화는 CPU에서만 지원됩니다. FP32 모델을 사용합니다.")
+            return model
+        quantized = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        logger.info("임베딩 모델 INT8 동적 양자화 적용")
+        return quantized
+    except Exception as e:
+        logger.warning(f"임베딩 INT8 양자화 실패 → FP32 모델 사용: {str(e)}")
+        return model
+
+
 def get_embeddings(texts: List[str]) -> List[List[float]]:
     """
     텍스트 리스트를 임베딩 벡터로 변환
@@ -37,17 +181,23 @@ def get_embeddings(texts: List[str]) -> List[List[float]]:
     Returns:
         임베딩 벡터 리스트
     """
+    return _encode(texts).tolist()
+
+
+def _encode(texts: List[str]) -> np.ndarray:
+    """(n, dim) float32 임베딩 배열"""
     model = init_embedder()
     
     # 배치 처리로 효율적으로 임베딩 생성
-    embeddings = model.encode(
-        texts,
-        batch_size=32,
-        show_progress_bar=False,
-        convert_to_numpy=True
-    )
+    with _inference_mode():
+        embeddings = model.encode(
+            texts,
+            batch_size=32,
+            show_progress_bar=False,
+            convert_to_numpy=True
+        )
     
-    return embeddings.tolist()
+    return embeddings
 
 
 def get_embedding(text: str) -> List[float]:
@@ -60,5 +210,71 @@ def get_embedding(text: str) -> List[float]:
     Returns:
         임베딩 벡터
     """
-    return get_embeddings([text])[0]
+    # 같은 질문이 semantic cache와 벡터 검색에서 각각 임베딩되므로, 결과를 LRU로 재사용합니다.
+    # 캐시에는 읽기 전용 float32 배열을 두고, 호출자에게는 매번 새 리스트를 돌려줍니다.
+    return _embed_one_cached(text).tolist()
+
+
+def get_embedding_np(text: str) -> np.ndarray:
+    """
+    get_embedding과 같지만 float32 배열(읽기 전용, 캐시 공유)을 그대로 반환합니다.
+    - NumPy로 후처리하는 호출자가 list → ndarray 변환을 다시 하지 않도록 합니다.
+    - 수정이 필요하면 호출자가 복사해서 사용하세요.
+    """
+    return _embed_one_cached(text)
+
+
+@lru_cache(maxsize=max(0, _QUERY_CACHE_MAX_ENTRIES))
+def _embed_one_cached(text: str) -> np.ndarray:
+    vec = _embed_batched(text) if _BATCH_WINDOW_S > 0 else _encode([text])[0]
+    vec.setflags(write=False)
+    return vec
+
+
+def _embed_batched(text: str) -> np.ndarray:
+    """
+    동시에 들어온 단일 질문 임베딩을 한 번의 model.encode로 묶습니다. (dynamic batching)
+    - 호출자는 asyncio.to_thread 워커 스레드에서 들어오므로 스레드 기반으로 동작합니다.
+    - 배치의 첫 호출자가 리더가 되어 _BATCH_WINDOW_S 동안(또는 _BATCH_MAX_SIZE개가 모일 때까지) 합류를
+      기다린 뒤 모인 텍스트를 한 번에 인코딩하고, 나머지 호출자는 결과(future)만 기다립니다.
+    - 배치가 가득 차면 그 뒤의 호출자는 다음 배치의 리더/멤버가 되므로 encode 한 번의 크기가 제한됩니다.
+    """
+    global _pending, _pending_full
+    fut: "Future[np.ndarray]" = Future()
+    with _pending_lock:
+        batch = _pending
+        full = _pending_full
+        batch.append((text, fut))
+        is_leader = len(batch) == 1
+        if len(batch) >= _BATCH_MAX_SIZE:
+            _pending = []
+            _pending_full = threading.Event()
+            full.set()
+
+    if is_leader:
+        full.wait(_BATCH_WINDOW_S)
+        with _pending_lock:
+            # 창이 끝날 때까지 가득 차지 않았으면 여기서 떼어 내 더 이상 합류하지 않게 합니다.
+            if _pending is batch:
+                _pending = []
+                _pending_full = threading.Event()
+        # 같은 질문이 동시에 들어온 경우 한 번만 인코딩합니다.
+        index: Dict[str, int] = {}
+        for t, _ in batch:
+            index.setdefault(t, len(index))
+        try:
+            vecs = _encode(list(index))
+        except BaseException as e:
+            for _, f in batch:
+                f.set_exception(e)
+        else:
+            for t, f in batch:
+                f.set_result(vecs[index[t]])
+
+    return fut.result()
+
+
+def clear_embedding_cache() -> None:
+    """질문 임베딩 캐시를 비웁니다. (임베딩 모델 교체 시)"""
+    _embed_one_cached.cache_clear()
 
@@ -11,21 +11,26 @@ RAG 인덱서 (배치/워커용)
 
 from __future__ import annotations
 
+from itertools import islice
 from typing import List, Dict, Any, Optional
 import logging
-import os
 
-from db.repository import get_all_product_texts, get_product_texts_by_ids
+from db.repository import iter_all_product_texts, iter_product_texts_by_ids
 from rag.chunker import chunk_product_texts
 from rag.vector_store import add_documents, get_collection_stats, clear_collection
+from utils.env import load_bool_env, load_int_env
 
 logger = logging.getLogger(__name__)
 
+# 한 번에 임베딩/upsert할 청크 수 (청크 전체를 메모리에 모으지 않도록 고정 크기로 나눠 반영)
+INDEX_BATCH_SIZE = max(1, load_int_env("RAG_INDEX_BATCH_SIZE", 512))
+
 
 def index_products(
     *,
     product_ids: Optional[List[int]] = None,
     clear_on_index: Optional[bool] = None,
+    batch_size: Optional[int] = None,
 ) -> Dict[str, Any]:
     """
     상품 텍스트를 ChromaDB에 인덱싱합니다.
@@ -33,18 +38,15 @@ def index_products(
     Args:
         product_ids: 특정 상품만 인덱싱할 경우 ID 리스트 (None이면 전체)
         clear_on_index: True면 컬렉션을 비우고 재구축 (None이면 env 기반)
+        batch_size: 한 번에 임베딩/upsert할 청크 수 (None이면 INDEX_BATCH_SIZE)
 
     Returns:
         {"indexed_chunks": int, "document_count": int}
     """
     if clear_on_index is None:
-        clear_on_index = os.getenv("RAG_CLEAR_COLLECTION_ON_INDEX", "true").lower() in [
-            "1",
-            "true",
-            "yes",
-            "y",
-            "on",
-        ]
+        clear_on_index = load_bool_env("RAG_CLEAR_COLLECTION_ON_INDEX", True)
+
+    batch_size = max(1, batch_size or INDEX_BATCH_SIZE)
 
     if clear_on_index:
         logger.info(
@@ -52,28 +54,33 @@ def index_products(
         )
         clear_collection()
 
-    # 1) DB에서 텍스트 로드
+    # 1) DB에서 텍스트 로드 + 2) 청킹 + 3) 벡터 스토어 반영
+    # - 텍스트/청크를 리스트로 모으지 않고 스트리밍으로 읽으면서 바로 청킹하고,
+    #   batch_size개씩 끊어 임베딩 + upsert합니다.
     if product_ids:
-        product_texts = get_product_texts_by_ids(product_ids)
-        logger.info("선택 상품 텍스트 로드 완료 (products=%s, texts=%s)", len(product_ids), len(product_texts))
+        product_texts = iter_product_texts_by_ids(product_ids)
+        logger.info("선택 상품 텍스트 로드 중 (products=%s)", len(product_ids))
     else:
-        product_texts = get_all_product_texts()
-        logger.info("전체 상품 텍스트 로드 완료 (texts=%s)", len(product_texts))
-
-    if not product_texts:
+        product_texts = iter_all_product_texts()
+        logger.info("전체 상품 텍스트 로드 중")
+
+    chunks = chunk_product_texts(product_texts)
+    indexed_chunks = 0
+    while True:
+        batch = list(islice(chunks, batch_size))
+        if not batch:
+            break
+        add_documents(batch)
+        indexed_chunks += len(batch)
+
+    if not indexed_chunks:
         logger.warning("인덱싱할 텍스트가 없습니다.")
         stats = get_collection_stats()
         return {"indexed_chunks": 0, "document_count": stats["document_count"]}
-
-    # 2) 청킹
-    chunked_data = chunk_product_texts(product_texts)
-    logger.info("청크 생성 완료 (chunks=%s)", len(chunked_data))
-
-    # 3) 벡터 스토어 반영
-    add_documents(chunked_data)
+    logger.info("청크 반영 완료 (chunks=%s)", indexed_chunks)
 
     stats = get_collection_stats()
     logger.info("인덱싱 완료 (document_count=%s)", stats["document_count"])
-    return {"indexed_chunks": len(chunked_data), "document_count": stats["document_count"]}
+    return {"indexed_chunks": indexed_chunks, "document_count": stats["document_count"]}
 
 
@@ -0,0 +1,199 @@
+"""
+인메모리 벡터 인덱스 (선택, RAG_IN_MEMORY_INDEX=true)
+- Chroma 컬렉션의 임베딩/메타데이터를 API 프로세스 메모리(NumPy float32)로 올려 두고,
+  검색을 프로세스 안에서 행렬 연산으로 수행합니다. (쿼리마다 Chroma/SQLite를 거치지 않음)
+- Chroma는 그대로 원본 저장소이며(워커가 인덱싱), 이 인덱스는 읽기 전용 사본입니다.
+- 워커가 재인덱싱하면 Chroma 저장 파일의 변경(mtime/size)을 감지해 다음 검색 때 다시 적재합니다.
+- 행을 상품별로 정렬해 두고 해당 상품 구간만 전수 비교하므로, 결과는 근사(HNSW)가 아닌 정확한 top_k입니다.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple, Union
+import logging
+import threading
+
+import numpy as np
+
+from rag.embedder import get_embedding_np
+from rag.vector_store import get_collection, get_store_version, is_searchable_query
+
+logger = logging.getLogger(__name__)
+
+# Chroma에서 한 번에 읽어 올 문서 수
+_LOAD_BATCH_SIZE = 5000
+
+
+@dataclass(frozen=True)
+class _Snapshot:
+    """
+    적재 시점의 컬렉션 사본. i번째 행이 모든 배열/리스트의 i번째 항목에 대응합니다.
+    - 행은 product_id 순으로 정렬되어 있어, 상품 하나의 청크는 연속 구간(product_slices)을 이룹니다.
+    """
+
+    version: str
+    space: str  # Chroma 거리 함수 (l2 | ip | cosine)
+    ids: List[str]
+    documents: List[str]
+    types: np.ndarray  # (n,) object(str)
+    product_ids: np.ndarray  # (n,) int64
+    original_ids: np.ndarray  # (n,) int64
+    chunk_indexes: np.ndarray  # (n,) int64
+    vectors: np.ndarray  # (n, dim) float32
+    sq_norms: np.ndarray  # (n,) float32, l2 거리 계산용 ||x||^2
+    product_slices: Dict[int, Tuple[int, int]]  # product_id -> [start, end) 행 구간
+
+
+_snapshot: Optional[_Snapshot] = None
+_lock = threading.Lock()
+
+
+def _load_snapshot(version: str) -> _Snapshot:
+    collection = get_collection()
+    space = str((collection.metadata or {}).get("hnsw:space") or "l2")
+
+    ids: List[str] = []
+    documents: List[str] = []
+    metadatas: List[Dict[str, Any]] = []
+    embeddings: List[List[float]] = []
+    offset = 0
+    while True:
+        page = collection.get(
+            include=["embeddings", "documents", "metadatas"],
+            limit=_LOAD_BATCH_SIZE,
+            offset=offset,
+        )
+        page_ids = page["ids"] or []
+        if not page_ids:
+            break
+        ids.extend(page_ids)
+        documents.extend(page["documents"])
+        metadatas.extend(page["metadatas"])
+        embeddings.extend(page["embeddings"])
+        offset += len(page_ids)
+        if len(page_ids) < _LOAD_BATCH_SIZE:
+            break
+
+    vectors = np.asarray(embeddings, dtype=np.float32)
+    if vectors.ndim != 2:  # 빈 컬렉션
+        vectors = np.zeros((len(ids), 0), dtype=np.float32)
+    product_ids = np.asarray([int(m["product_id"]) for m in metadatas], dtype=np.int64)
+
+    # 상품별 서브 인덱스: product_id로 (안정) 정렬해 상품마다 연속된 행 구간을 갖게 합니다.
+    # 검색 시 전체 행에 필터 마스크를 만들지 않고, 해당 구간의 벡터(view)만 비교합니다.
+    order = np.argsort(product_ids, kind="stable")
+    product_ids = product_ids[order]
+    vectors = np.ascontiguousarray(vectors[order])
+    metadatas = [metadatas[i] for i in order]
+    unique_ids, starts, counts = np.unique(product_ids, return_index=True, return_counts=True)
+    product_slices = {
+        int(pid): (int(start), int(start + count))
+        for pid, start, count in zip(unique_ids, starts, counts)
+    }
+
+    logger.info(
+        "인메모리 벡터 인덱스 적재 완료 (count=%s, products=%s, space=%s)",
+        len(ids),
+        len(product_slices),
+        space,
+    )
+    return _Snapshot(
+        version=version,
+        space=space,
+        ids=[ids[i] for i in order],
+        documents=[documents[i] for i in order],
+        types=np.asarray([m["type"] for m in metadatas], dtype=object),
+        product_ids=product_ids,
+        original_ids=np.asarray([int(m.get("original_id") or 0) for m in metadatas], dtype=np.int64),
+        chunk_indexes=np.asarray([int(m.get("chunk_index") or 0) for m in metadatas], dtype=np.int64),
+        vectors=vectors,
+        sq_norms=np.einsum("ij,ij->i", vectors, vectors),
+        product_slices=product_slices,
+    )
+
+
+def get_snapshot() -> _Snapshot:
+    """현재 인덱스 사본을 반환합니다. Chroma 저장 파일이 바뀌었으면 다시 적재합니다."""
+    global _snapshot
+    version = get_store_version()
+    snap = _snapshot
+    if snap is not None and snap.version == version:
+        return snap
+    with _lock:
+        if _snapshot is None or _snapshot.version != version:
+            _snapshot = _load_snapshot(version)
+        return _snapshot
+
+
+def _distances(snap: _Snapshot, rows: Union[slice, np.ndarray], query_vec: np.ndarray) -> np.ndarray:
+    """Chroma(hnswlib)와 같은 정의의 거리 (l2는 제곱 거리). rows가 slice면 복사 없이 view로 계산합니다."""
+    dots = snap.vectors[rows] @ query_vec
+    if snap.space == "ip":
+        return 1.0 - dots
+    if snap.space == "cosine":
+        denom = np.sqrt(snap.sq_norms[rows]) * float(np.linalg.norm(query_vec))
+        return 1.0 - dots / np.where(denom > 0, denom, 1.0)
+    return np.maximum(snap.sq_norms[rows] - 2.0 * dots + float(query_vec @ query_vec), 0.0)
+
+
+def search(
+    query: str,
+    product_id: int,
+    top_k: int = 5,
+    text_type: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """
+    vector_store.search_documents(_by_type)와 같은 형태의 결과를 인메모리 인덱스에서 찾습니다.
+
+    Args:
+        query: 검색 쿼리
+        product_id: 상품 ID (필터)
+        top_k: 반환할 문서 수
+        text_type: 지정하면 해당 타입만 검색
+
+    Returns:
+        검색 결과 리스트 (거리 오름차순)
+    """
+    if not is_searchable_query(query) or top_k <= 0:
+        return []
+
+    snap = get_snapshot()
+    bounds = snap.product_slices.get(int(product_id))
+    if bounds is None:
+        return []
+    start, end = bounds
+    row_ids: Optional[np.ndarray] = None
+    if text_type is None:
+        rows: Union[slice, np.ndarray] = slice(start, end)
+        n = end - start
+    else:
+        row_ids = start + np.flatnonzero(snap.types[start:end] == text_type)
+        rows = row_ids
+        n = row_ids.size
+        if n == 0:
+            return []
+
+    distances = _distances(snap, rows, get_embedding_np(query))
+    k = min(top_k, n)
+    best = np.argpartition(distances, k - 1)[:k] if k < n else np.arange(n)
+    best = best[np.argsort(distances[best], kind="stable")]
+
+    documents = []
+    for j in best:
+        i = start + int(j) if row_ids is None else int(row_ids[j])
+        documents.append({
+            "source_id": snap.ids[i],
+            "content": snap.documents[i],
+            "type": snap.types[i],
+            # vector_store와 동일한 정규화: similarity = 1 / (1 + distance) ∈ (0, 1]
+            "score": 1.0 / (1.0 + float(distances[j])),
+            "product_id": int(snap.product_ids[i]),
+            "original_id": int(snap.original_ids[i]),
+            "chunk_index": int(snap.chunk_indexes[i]),
+        })
+    return documents
+
+
+def document_count() -> int:
+    """인메모리 인덱스의 문서 수"""
+    return len(get_snapshot().ids)
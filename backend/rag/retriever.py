@@ -8,13 +8,21 @@ RAG 검색 파이프라인
 from typing import List, Dict, Any
 import logging
 
+from rag import memory_index
 from rag.vector_store import (
     search_documents,
     get_collection_stats,
+    is_searchable_query,
 )
+from utils.env import load_bool_env
 
 logger = logging.getLogger(__name__)
 
+# true면 Chroma 대신 API 프로세스 메모리에 올린 사본(rag/memory_index.py)에서 검색합니다.
+# (false로 두면 기존 Chroma 쿼리 경로 그대로)
+IN_MEMORY_INDEX_ENABLED = load_bool_env("RAG_IN_MEMORY_INDEX", False)
+
+
 def retrieve_context(
     query: str,
     product_id: int,
@@ -31,15 +39,26 @@ def retrieve_context(
     Returns:
         검색된 컨텍스트 리스트
     """
+    # 빈/너무 짧은 질문은 인덱스 통계 조회·임베딩·Chroma 검색을 모두 건너뜁니다.
+    if not is_searchable_query(query):
+        return []
+
     # API 서버는 조회만 수행합니다.
     # 인덱싱(임베딩 생성/업서트)은 별도 워커에서 수행해야 합니다.
-    stats = get_collection_stats()
-    if int(stats.get("document_count", 0) or 0) <= 0:
+    if IN_MEMORY_INDEX_ENABLED:
+        document_count = memory_index.document_count()
+    else:
+        stats = get_collection_stats()
+        document_count = int(stats.get("document_count", 0) or 0)
+    if document_count <= 0:
         logger.warning(
             "벡터 인덱스가 비어 있습니다. 워커로 인덱싱을 먼저 수행하세요. (document_count=0)"
         )
         return []
 
+    if IN_MEMORY_INDEX_ENABLED:
+        return memory_index.search(query, product_id, top_k=top_k)
+
     # 벡터 검색
     results = search_documents(
         query=query,
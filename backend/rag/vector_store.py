@@ -11,6 +11,8 @@ from chromadb.config import Settings
 from typing import List, Dict, Any
 import logging
 
+import numpy as np
+
 from rag.embedder import get_embeddings, get_embedding
 
 logger = logging.getLogger(__name__)
@@ -40,6 +42,14 @@ def _resolve_persist_dir() -> str:
 CHROMA_PERSIST_DIR = _resolve_persist_dir()
 COLLECTION_NAME = "product_texts"
 
+# 이보다 짧은(공백 제외) 질문은 임베딩/벡터 검색 없이 빈 결과를 반환합니다.
+MIN_QUERY_CHARS = 2
+
+
+def is_searchable_query(query: str) -> bool:
+    """임베딩 + 벡터 검색을 할 가치가 있는 질문인지 (빈 문자열/한 글자 입력 제외)"""
+    return len((query or "").strip()) >= MIN_QUERY_CHARS
+
 
 def init_chroma():
     """ChromaDB 초기화"""
@@ -98,27 +108,38 @@ def add_documents(documents: List[Dict[str, Any]]):
     total = len(documents)
     logger.info(f"임베딩 생성 중... (count={total})")
     
+    # 내용/ID/메타데이터를 문서 한 번 순회로 만듭니다. (필드별로 문서를 다시 훑지 않도록)
+    # IMPORTANT: original_id는 각 테이블(products/order_reviews/product_qna)에서 1부터 다시 시작하므로,
+    # type을 포함하지 않으면 서로 다른 문서가 같은 ID를 가져 DuplicateIDError가 발생할 수 있습니다.
+    # 청크는 같은 상품/타입끼리 연속으로 들어오므로, "{product_id}_{type}_" 접두사와
+    # product_id 문자열은 직전 문서와 같으면 그대로 재사용합니다.
+    contents: List[str] = []
+    ids: List[str] = []
+    metadatas: List[Dict[str, str]] = []
+    prev_key = None
+    product_id = prefix = ""
+    for doc in documents:
+        text_type = doc["type"]
+        key = (doc["product_id"], text_type)
+        if key != prev_key:
+            prev_key = key
+            product_id = str(doc["product_id"])
+            prefix = f"{product_id}_{text_type}_"
+        original_id = str(doc["original_id"])
+        chunk_index = str(doc["chunk_index"])
+        contents.append(doc["content"])
+        ids.append(f"{prefix}{original_id}_{chunk_index}")
+        metadatas.append({
+            "product_id": product_id,
+            "type": text_type,
+            "original_id": original_id,
+            "chunk_index": chunk_index,
+        })
+
     # 임베딩 생성
-    contents = [doc["content"] for doc in documents]
     embeddings = get_embeddings(contents)
     
     # ChromaDB에 추가
-    # IMPORTANT: original_id는 각 테이블(products/order_reviews/product_qna)에서 1부터 다시 시작하므로,
-    # type을 포함하지 않으면 서로 다른 문서가 같은 ID를 가져 DuplicateIDError가 발생할 수 있습니다.
-    ids = [
-        f"{doc['product_id']}_{doc['type']}_{doc['original_id']}_{doc['chunk_index']}"
-        for doc in documents
-    ]
-    metadatas = [
-        {
-            "product_id": str(doc["product_id"]),
-            "type": doc["type"],
-            "original_id": str(doc["original_id"]),
-            "chunk_index": str(doc["chunk_index"])
-        }
-        for doc in documents
-    ]
-    
     if hasattr(collection, "upsert"):
         collection.upsert(
             ids=ids,
@@ -138,6 +159,34 @@ def add_documents(documents: List[Dict[str, Any]]):
         logger.info(f"벡터 인덱스 반영 완료 (add count={total})")
 
 
+def _parse_query_results(results: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """collection.query 결과(쿼리 1개)를 검색 결과 dict 리스트로 변환합니다."""
+    if not results["ids"] or not results["ids"][0]:
+        return []
+
+    # Chroma distance는 메트릭/데이터에 따라 1보다 커질 수 있으므로,
+    # (1 - distance) 같은 단순 변환은 음수 유사도를 만들어 가드 로직을 망가뜨립니다.
+    # 안전한 정규화: similarity = 1 / (1 + distance) ∈ (0, 1]
+    # 행마다 파이썬 float 연산을 하지 않고 한 번의 벡터 연산으로 계산합니다. (float64: 기존 값과 동일)
+    scores = (1.0 / (1.0 + np.asarray(results["distances"][0], dtype=np.float64))).tolist()
+    return [
+        {
+            # Chroma 문서 고유 ID (업서트 시 생성한 id)
+            "source_id": source_id,
+            "content": content,
+            "type": meta["type"],
+            "score": score,
+            "product_id": int(meta["product_id"]),
+            # 디버깅/추적용 메타데이터
+            "original_id": int(meta.get("original_id") or 0),
+            "chunk_index": int(meta.get("chunk_index") or 0),
+        }
+        for source_id, content, meta, score in zip(
+            results["ids"][0], results["documents"][0], results["metadatas"][0], scores
+        )
+    ]
+
+
 def search_documents(
     query: str,
     product_id: int,
@@ -154,6 +203,9 @@ def search_documents(
     Returns:
         검색 결과 리스트
     """
+    if not is_searchable_query(query):
+        return []
+
     collection = get_collection()
     
     # 쿼리 임베딩 생성
@@ -166,27 +218,7 @@ def search_documents(
         where={"product_id": str(product_id)}  # 필터: 해당 상품만
     )
     
-    # 결과 파싱
-    documents = []
-    if results["ids"] and results["ids"][0]:
-        for i in range(len(results["ids"][0])):
-            distance = results["distances"][0][i]
-            documents.append({
-                # Chroma 문서 고유 ID (업서트 시 생성한 id)
-                "source_id": results["ids"][0][i],
-                "content": results["documents"][0][i],
-                "type": results["metadatas"][0][i]["type"],
-                # Chroma distance는 메트릭/데이터에 따라 1보다 커질 수 있으므로,
-                # (1 - distance) 같은 단순 변환은 음수 유사도를 만들어 가드 로직을 망가뜨립니다.
-                # 안전한 정규화: similarity = 1 / (1 + distance) ∈ (0, 1]
-                "score": 1.0 / (1.0 + float(distance)),
-                "product_id": int(results["metadatas"][0][i]["product_id"]),
-                # 디버깅/추적용 메타데이터
-                "original_id": int(results["metadatas"][0][i].get("original_id") or 0),
-                "chunk_index": int(results["metadatas"][0][i].get("chunk_index") or 0),
-            })
-    
-    return documents
+    return _parse_query_results(results)
 
 
 def search_documents_by_type(
@@ -207,6 +239,9 @@ def search_documents_by_type(
     Returns:
         검색 결과 리스트
     """
+    if not is_searchable_query(query):
+        return []
+
     collection = get_collection()
 
     # 쿼리 임베딩 생성
@@ -224,22 +259,7 @@ def search_documents_by_type(
         }
     )
 
-    # 결과 파싱
-    documents = []
-    if results["ids"] and results["ids"][0]:
-        for i in range(len(results["ids"][0])):
-            distance = results["distances"][0][i]
-            documents.append({
-                "source_id": results["ids"][0][i],
-                "content": results["documents"][0][i],
-                "type": results["metadatas"][0][i]["type"],
-                "score": 1.0 / (1.0 + float(distance)),
-                "product_id": int(results["metadatas"][0][i]["product_id"]),
-                "original_id": int(results["metadatas"][0][i].get("original_id") or 0),
-                "chunk_index": int(results["metadatas"][0][i].get("chunk_index") or 0),
-            })
-
-    return documents
+    return _parse_query_results(results)
 
 
 def clear_collection():
@@ -260,6 +280,22 @@ def clear_collection():
         logger.info(f"컬렉션 재생성: {COLLECTION_NAME}")
 
 
+def get_store_version() -> str:
+    """
+    Chroma 저장 파일 상태(mtime/size) 기반 버전 문자열 (stat만으로 계산)
+    - 워커가 다른 프로세스에서 재인덱싱해도 API 프로세스가 변경을 감지할 수 있습니다.
+    """
+    parts = []
+    for name in ("chroma.sqlite3", "chroma.sqlite3-wal"):
+        try:
+            st = os.stat(os.path.join(CHROMA_PERSIST_DIR, name))
+        except OSError:
+            parts.append("-")
+            continue
+        parts.append(f"{st.st_mtime_ns}:{st.st_size}")
+    return "|".join(parts)
+
+
 def get_collection_stats():
     """컬렉션 통계 반환"""
     collection = get_collection()
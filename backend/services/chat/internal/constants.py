@@ -1,7 +1,9 @@
 from __future__ import annotations
 
-from typing import List, Set
-import os
+from typing import FrozenSet
+import sys
+
+from utils.env import load_bool_env, load_csv_env, load_float_env, load_int_env
 
 
 # similarity는 1/(1+distance)로 정규화되어 보통 0.01~0.2 사이로 분포할 수 있습니다.
@@ -11,21 +13,11 @@ DIRECT_QNA_MIN_SCORE = 0.07  # QnA는 원문 답변을 그대로 쓰는 편이 
 DIRECT_QNA_STRONG_SCORE = 0.18  # 매우 높은 점수면 직접 반환 허용
 
 
-def load_csv_env(name: str, default: List[str]) -> List[str]:
-    """
-    콤마(,)로 구분된 환경변수를 리스트로 파싱합니다.
-    - 운영 중 튜닝을 위해 룰/키워드를 코드 하드코딩으로 두지 않습니다.
-    """
-    raw = os.getenv(name)
-    if not raw:
-        return default
-    parts = [p.strip() for p in raw.split(",")]
-    return [p for p in parts if p]
-
-
 # 키워드 휴리스틱 설정(운영 중 조정 가능)
-QUERY_STOP_TOKENS: Set[str] = set(
-    load_csv_env(
+# - 요청마다 토큰 단위로 멤버십 검사를 하므로 읽기 전용 frozenset으로 고정하고 문자열을 intern합니다.
+QUERY_STOP_TOKENS: FrozenSet[str] = frozenset(
+    sys.intern(tok)
+    for tok in load_csv_env(
         "CHAT_QUERY_STOP_TOKENS",
         [
             "이",
@@ -63,11 +55,15 @@ QUERY_STOP_TOKENS: Set[str] = set(
 )
 
 
-DIRECT_QNA_ENABLED = os.getenv("CHAT_DIRECT_QNA_ENABLED", "false").lower() in [
-    "1",
-    "true",
-    "yes",
-    "y",
-    "on",
-]
+DIRECT_QNA_ENABLED = load_bool_env("CHAT_DIRECT_QNA_ENABLED", False)
+
+# 시맨틱 캐시: 같은 상품에서 거의 같은 질문이 반복되면 검색/LLM 호출 없이 직전 응답을 재사용합니다.
+SEMANTIC_CACHE_ENABLED = load_bool_env("CHAT_SEMANTIC_CACHE_ENABLED", True)
+SEMANTIC_CACHE_MIN_SIMILARITY = load_float_env("CHAT_SEMANTIC_CACHE_MIN_SIMILARITY", 0.95)
+SEMANTIC_CACHE_MAX_ENTRIES = load_int_env("CHAT_SEMANTIC_CACHE_MAX_ENTRIES", 128)  # 상품별 상한
+SEMANTIC_CACHE_TTL_SECONDS = load_float_env("CHAT_SEMANTIC_CACHE_TTL_SECONDS", 600.0)
 
+# 완전 일치 캐시(L1): 정규화한 질문 문자열이 같으면 임베딩 계산 없이 바로 응답합니다.
+EXACT_CACHE_ENABLED = load_bool_env("CHAT_EXACT_CACHE_ENABLED", True)
+EXACT_CACHE_MAX_ENTRIES = load_int_env("CHAT_EXACT_CACHE_MAX_ENTRIES", 2048)
+EXACT_CACHE_TTL_SECONDS = load_float_env("CHAT_EXACT_CACHE_TTL_SECONDS", 600.0)
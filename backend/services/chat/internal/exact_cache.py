@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+import copy
+import re
+import threading
+import time
+import unicodedata
+
+from .constants import EXACT_CACHE_MAX_ENTRIES, EXACT_CACHE_TTL_SECONDS
+
+_WS_RE = re.compile(r"\s+")
+
+# (product_id, 정규화 질문) -> (저장 시각, 응답). 끝쪽이 최근 사용.
+_entries: "OrderedDict[Tuple[int, str], Tuple[float, Dict[str, Any]]]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def normalize_query(query: str) -> str:
+    """NFKC + 소문자 + 공백 정리로 표기만 다른 같은 질문을 하나의 키로 묶습니다."""
+    q = unicodedata.normalize("NFKC", query or "").lower()
+    return _WS_RE.sub(" ", q).strip()
+
+
+def lookup(product_id: int, query: str) -> Optional[Dict[str, Any]]:
+    """캐시된 응답의 복사본을 반환합니다. (없거나 만료되면 None)"""
+    key = (product_id, normalize_query(query))
+    now = time.monotonic()
+    with _lock:
+        hit = _entries.get(key)
+        if hit is None:
+            return None
+        stored_at, response = hit
+        if EXACT_CACHE_TTL_SECONDS > 0 and now - stored_at >= EXACT_CACHE_TTL_SECONDS:
+            del _entries[key]
+            return None
+        _entries.move_to_end(key)
+        return copy.deepcopy(response)
+
+
+def store(product_id: int, query: str, response: Dict[str, Any]) -> None:
+    """응답을 저장합니다. 상한을 넘으면 가장 오래 사용되지 않은 항목부터 제거합니다."""
+    if EXACT_CACHE_MAX_ENTRIES <= 0:
+        return
+    key = (product_id, normalize_query(query))
+    with _lock:
+        _entries[key] = (time.monotonic(), copy.deepcopy(response))
+        _entries.move_to_end(key)
+        while len(_entries) > EXACT_CACHE_MAX_ENTRIES:
+            _entries.popitem(last=False)
+
+
+def clear() -> None:
+    """캐시 전체를 비웁니다."""
+    with _lock:
+        _entries.clear()
@@ -1,29 +1,86 @@
 from __future__ import annotations
 
-from typing import Optional
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, Optional, Tuple
 import json
 import re
 
+# pyahocorasick은 선택 의존성입니다. 없으면 부분 문자열 검사로 폴백합니다.
+try:
+    import ahocorasick  # type: ignore
+except Exception:  # pragma: no cover
+    ahocorasick = None  # type: ignore
+
+# orjson도 선택 의존성입니다. 없으면 표준 json으로 파싱합니다.
+try:
+    import orjson  # type: ignore
+except Exception:  # pragma: no cover
+    orjson = None  # type: ignore
+
+from llm.prompt import POLARITY_HINT_TEXT
+
 from .constants import QUERY_STOP_TOKENS
 
+# 2글자 이상(한글/영문/숫자) 토큰
+_TOKEN_RE = re.compile(r"[0-9a-z가-힣]{2,}")
+# 코드펜스 (```json ... ```)
+_FENCE_OPEN_RE = re.compile(r"^```[a-zA-Z0-9_-]*\s*")
+_FENCE_CLOSE_RE = re.compile(r"\s*```$")
+# 부정형 질문 감지 (예: "…할 수 없어?", "안 돼?", "못 해?")
+_NEG_Q_RE = re.compile(r"(없어\?|없나요\?|안\s*돼\?|안되\?|못\s*해\?|못해\?|불가\?|불가능\?)\s*$")
+# 'Q: ...\nA: ...' 포맷 (Q는 첫 A: 직전까지, A는 끝까지)
+_QNA_RE = re.compile(r"Q:(?P<q>.*?)(?:A:(?P<a>.*))?\Z", re.DOTALL)
+
+# LLM이 프롬프트 템플릿/메타 문구를 복사했을 때 나타나는 표식 (소문자 기준)
+_TEMPLATE_RED_FLAGS = (
+    "[type]",
+    "답변 내용에 포함된 정보",
+    "=== 답변",
+    "=== 질문",
+    "q:",
+    "a:",
+    "답변 형식",
+    "(description|review|qna)",
+    "description|review|qna",
+)
+
+
+def _build_red_flag_automaton():
+    if ahocorasick is None:
+        return None
+    automaton = ahocorasick.Automaton()
+    for flag in _TEMPLATE_RED_FLAGS:
+        automaton.add_word(flag, flag)
+    automaton.make_automaton()
+    return automaton
+
+
+# 모든 표식을 한 번의 순회로 찾기 위한 Aho-Corasick 오토마톤 (모듈 로드 시 1회 생성)
+_RED_FLAG_AUTOMATON = _build_red_flag_automaton()
+
+
+def parse_qna(content: str) -> Tuple[Optional[str], Optional[str]]:
+    """product_texts.qna의 'Q: ...\\nA: ...' 포맷을 한 번에 (Q, A)로 분리"""
+    if not content:
+        return None, None
+    m = _QNA_RE.search(content)
+    if m is None:
+        # Q: 없이 A:만 있는 경우
+        _, sep, a = content.partition("A:")
+        return None, (a.strip() or None) if sep else None
+    q = m.group("q").strip() or None
+    a = (m.group("a") or "").strip() or None
+    return q, a
+
 
 def extract_qna_answer(content: str) -> Optional[str]:
     """product_texts.qna의 'Q: ...\\nA: ...' 포맷에서 A만 추출"""
-    if not content or "A:" not in content:
-        return None
-    answer = content.split("A:", 1)[1].strip()
-    return answer or None
+    return parse_qna(content)[1]
 
 
 def extract_qna_question(content: str) -> Optional[str]:
     """product_texts.qna의 'Q: ...\\nA: ...' 포맷에서 Q만 추출"""
-    if not content or "Q:" not in content:
-        return None
-    q_part = content.split("Q:", 1)[1]
-    if "A:" in q_part:
-        q_part = q_part.split("A:", 1)[0]
-    q = q_part.strip()
-    return q or None
+    return parse_qna(content)[0]
 
 
 def keyword_overlap(query: str, text: str) -> bool:
@@ -34,21 +91,35 @@ def keyword_overlap(query: str, text: str) -> bool:
     if not query or not text:
         return False
 
-    q = query.lower()
-    t = text.lower()
-
-    # 2글자 이상(한글/영문/숫자) 토큰만 사용
-    tokens = re.findall(r"[0-9a-z가-힣]{2,}", q)
-    if not tokens:
-        return False
-
-    tokens = [tok for tok in tokens if tok not in QUERY_STOP_TOKENS]
+    tokens = _query_tokens(query)
     if not tokens:
         return False
 
+    t = text.lower()
     return any(tok in t for tok in tokens)
 
 
+@lru_cache(maxsize=1024)
+def _query_tokens(query: str) -> FrozenSet[str]:
+    """
+    질문의 2글자 이상(한글/영문/숫자) 토큰 중 불용어를 뺀 집합
+    - 중복 토큰은 한 번만 검사하도록 집합으로 만들고, 같은 질문(추천 질문 클릭/재시도)은 캐시를 재사용합니다.
+    """
+    return frozenset(_TOKEN_RE.findall(query.lower())).difference(QUERY_STOP_TOKENS)
+
+
+def detect_polarity(query: str) -> Dict[str, Any]:
+    """
+    부정형 질문 여부와 프롬프트에 넣을 보조 힌트를 요청당 한 번 계산합니다.
+    - 한국어 부정형 질문은 의미가 애매해(수사/확인 질문) LLM이 예/아니오를 뒤집어 답하는 경우가 많습니다.
+
+    Returns:
+        {"is_negative": bool, "hint": str}  (hint는 build_prompt*의 polarity_hint로 전달)
+    """
+    is_negative = bool(_NEG_Q_RE.search((query or "").strip()))
+    return {"is_negative": is_negative, "hint": POLARITY_HINT_TEXT if is_negative else ""}
+
+
 def looks_like_template_garbage(answer: str) -> bool:
     """
     LLM이 프롬프트의 템플릿/설명 문구를 복사해버린 경우를 탐지.
@@ -57,18 +128,11 @@ def looks_like_template_garbage(answer: str) -> bool:
     if not answer:
         return True
     lowered = answer.lower()
-    red_flags = [
-        "[type]",
-        "답변 내용에 포함된 정보",
-        "=== 답변",
-        "=== 질문",
-        "q:",
-        "a:",
-        "답변 형식",
-        "(description|review|qna)",
-        "description|review|qna",
-    ]
-    hits = sum(1 for f in red_flags if f in lowered)
+    # 표식별로 한 번만 셉니다. (같은 표식이 여러 번 나와도 1 hit)
+    if _RED_FLAG_AUTOMATON is not None:
+        hits = len({flag for _, flag in _RED_FLAG_AUTOMATON.iter(lowered)})
+    else:
+        hits = sum(1 for f in _TEMPLATE_RED_FLAGS if f in lowered)
     if hits >= 2:
         return True
     # 같은 문장 반복(간단 휴리스틱)
@@ -77,24 +141,38 @@ def looks_like_template_garbage(answer: str) -> bool:
     return False
 
 
+def _json_loads(s: str):
+    # orjson(C 구현)이 있으면 먼저 사용합니다.
+    # orjson은 표준 json이 허용하는 NaN/Infinity, 64비트를 넘는 정수를 거부하므로
+    # 실패하면 표준 json으로 다시 파싱해 기존에 받아들이던 출력을 그대로 받아들입니다.
+    if orjson is not None:
+        try:
+            return orjson.loads(s)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(s)
+
+
 def extract_json_object(text: str) -> Optional[dict]:
     """
     LLM 출력에서 JSON 오브젝트를 최대한 안전하게 추출합니다.
     - 코드펜스가 섞여도 제거 시도
     - 앞뒤 잡문이 있어도 첫 '{' ~ 마지막 '}' 범위 파싱 시도
     """
-    if not text:
+    # '{'가 아예 없으면 JSON 오브젝트일 수 없으므로, 펜스 제거/파싱 시도 없이 바로 종료합니다.
+    # (LLM이 JSON 대신 평문으로 답한 경우)
+    if not text or "{" not in text:
         return None
     s = text.strip()
 
     # 코드펜스 제거 (```json ... ```)
     if s.startswith("```"):
-        s = re.sub(r"^```[a-zA-Z0-9_-]*\s*", "", s)
-        s = re.sub(r"\s*```$", "", s).strip()
+        s = _FENCE_OPEN_RE.sub("", s)
+        s = _FENCE_CLOSE_RE.sub("", s).strip()
 
     # 1차: 전체를 JSON으로 파싱
     try:
-        obj = json.loads(s)
+        obj = _json_loads(s)
         return obj if isinstance(obj, dict) else None
     except Exception:
         pass
@@ -106,7 +184,7 @@ def extract_json_object(text: str) -> Optional[dict]:
         return None
     candidate = s[start : end + 1]
     try:
-        obj = json.loads(candidate)
+        obj = _json_loads(candidate)
         return obj if isinstance(obj, dict) else None
     except Exception:
         return None
@@ -3,16 +3,19 @@ from __future__ import annotations
 from typing import Any, Dict, List
 
 
+_FALLBACK_ANSWER = (
+    "제공된 상품 정보에서 답변할 근거를 찾지 못해 정확히 안내드리기 어렵습니다. "
+    "상품 상세 페이지의 Q&A에 질문을 남겨주시면 확인 후 답변드릴게요."
+)
+
+
 def no_rag_fallback_answer() -> str:
     """
     RAG로 근거를 찾지 못했을 때의 폴백 문구.
     - 답변을 지어내지 않도록 즉시 종료합니다.
     - 사용자가 Q&A를 남기도록 유도합니다.
     """
-    return (
-        "제공된 상품 정보에서 답변할 근거를 찾지 못해 정확히 안내드리기 어렵습니다. "
-        "상품 상세 페이지의 Q&A에 질문을 남겨주시면 확인 후 답변드릴게요."
-    )
+    return _FALLBACK_ANSWER
 
 
 def build_chat_response(
@@ -45,11 +48,12 @@ def context_to_source(ctx: Dict[str, Any]) -> Dict[str, Any]:
 
 def build_no_rag_stop_response(*, selected_engine: str, product_id: int) -> Dict[str, Any]:
     """컨텍스트 부족 시 즉시 종료 응답(suggested_questions=[] 고정)."""
-    return build_chat_response(
-        answer=no_rag_fallback_answer(),
-        sources=[],
-        selected_engine=selected_engine,
-        product_id=product_id,
-        suggested_questions=[],
-    )
+    # 고정 문구에 engine/product_id만 바뀌므로 래퍼를 거치지 않고 dict를 바로 만듭니다.
+    return {
+        "answer": _FALLBACK_ANSWER,
+        "sources": [],
+        "engine": selected_engine,
+        "product_id": product_id,
+        "suggested_questions": [],
+    }
 
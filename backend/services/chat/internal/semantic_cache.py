@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+import copy
+import threading
+import time
+
+import numpy as np
+
+from rag.embedder import get_embedding_np
+
+from .constants import (
+    SEMANTIC_CACHE_MAX_ENTRIES,
+    SEMANTIC_CACHE_MIN_SIMILARITY,
+    SEMANTIC_CACHE_TTL_SECONDS,
+)
+
+
+@dataclass
+class _ProductBucket:
+    """상품 하나의 캐시. vectors의 i번째 행이 responses[i]에 대응합니다."""
+
+    vectors: Optional[np.ndarray] = None  # (n, dim) int8, 양자화된 질문 임베딩
+    scales: Optional[np.ndarray] = None  # (n,) float32, 행별 양자화 스케일
+    responses: List[Dict[str, Any]] = field(default_factory=list)
+    created_at: List[float] = field(default_factory=list)
+    last_used: List[float] = field(default_factory=list)
+
+    def drop(self, keep: List[int]) -> None:
+        """keep 인덱스만 남기고 나머지 엔트리를 제거합니다."""
+        self.vectors = self.vectors[keep] if keep and self.vectors is not None else None
+        self.scales = self.scales[keep] if keep and self.scales is not None else None
+        self.responses = [self.responses[i] for i in keep]
+        self.created_at = [self.created_at[i] for i in keep]
+        self.last_used = [self.last_used[i] for i in keep]
+
+
+# (product_id, 부정형 질문 여부) -> bucket
+# - 상품별 네임스페이스: 다른 상품의 답변이 섞이지 않도록 분리
+# - "…할 수 있어?"와 "…할 수 없어?"는 임베딩이 거의 같지만 예/아니오가 반대인 답이 필요하므로,
+#   질문 극성(guards.detect_polarity)도 키에 포함합니다.
+_buckets: Dict[Tuple[int, bool], _ProductBucket] = {}
+_lock = threading.Lock()
+
+
+def embed_query(query: str) -> np.ndarray:
+    """검색과 동일한 임베딩 모델로 질문을 임베딩하고 L2 정규화합니다."""
+    vec = get_embedding_np(query)
+    norm = float(np.linalg.norm(vec))
+    return vec / norm if norm > 0 else vec
+
+
+def _quantize(vec: np.ndarray) -> tuple[np.ndarray, float]:
+    """
+    정규화된 벡터를 행별 스케일을 갖는 int8로 양자화합니다.
+    - 캐시 적중 판정에는 FP32 정밀도가 필요 없고, 메모리/대역폭은 1/4로 줄어듭니다.
+    """
+    peak = float(np.max(np.abs(vec))) if vec.size else 0.0
+    scale = 127.0 / peak if peak > 0 else 1.0
+    return np.round(vec * scale).astype(np.int8), scale
+
+
+def _evict_expired(bucket: _ProductBucket, now: float) -> None:
+    if SEMANTIC_CACHE_TTL_SECONDS <= 0:
+        return
+    keep = [i for i, ts in enumerate(bucket.created_at) if now - ts < SEMANTIC_CACHE_TTL_SECONDS]
+    if len(keep) != len(bucket.responses):
+        bucket.drop(keep)
+
+
+def lookup(product_id: int, query_vec: np.ndarray, *, is_negative: bool) -> Optional[Dict[str, Any]]:
+    """
+    코사인 유사도가 임계값 이상인 캐시 응답을 찾습니다.
+    - is_negative: 부정형 질문 여부. 극성이 같은 질문의 응답만 재사용합니다.
+    - 반환값은 복사본이므로 호출자가 수정해도 캐시에 영향이 없습니다.
+    """
+    now = time.monotonic()
+    with _lock:
+        bucket = _buckets.get((product_id, is_negative))
+        if bucket is None:
+            return None
+        _evict_expired(bucket, now)
+        if bucket.vectors is None:
+            return None
+
+        # 정규화된 벡터끼리의 내적 = 코사인 유사도
+        # int8 곱의 합은 int8 범위를 넘으므로 int32로 누적한 뒤 스케일을 되돌립니다.
+        q8, q_scale = _quantize(query_vec)
+        dots = np.matmul(bucket.vectors, q8, dtype=np.int32)
+        scores = dots / (bucket.scales * q_scale)
+        best = int(np.argmax(scores))
+        if float(scores[best]) < SEMANTIC_CACHE_MIN_SIMILARITY:
+            return None
+
+        bucket.last_used[best] = now
+        return copy.deepcopy(bucket.responses[best])
+
+
+def store(product_id: int, query_vec: np.ndarray, response: Dict[str, Any], *, is_negative: bool) -> None:
+    """
+    응답을 캐시에 추가합니다. 상한을 넘으면 가장 오래 사용되지 않은 엔트리를 제거합니다.
+    - 상한은 (상품, 극성) 버킷별로 적용됩니다.
+    """
+    if SEMANTIC_CACHE_MAX_ENTRIES <= 0:
+        return
+
+    now = time.monotonic()
+    with _lock:
+        bucket = _buckets.setdefault((product_id, is_negative), _ProductBucket())
+        _evict_expired(bucket, now)
+
+        if len(bucket.responses) >= SEMANTIC_CACHE_MAX_ENTRIES:
+            # LRU: last_used가 가장 오래된 엔트리부터 제거
+            order = sorted(range(len(bucket.last_used)), key=lambda i: bucket.last_used[i])
+            drop_count = len(bucket.responses) - SEMANTIC_CACHE_MAX_ENTRIES + 1
+            bucket.drop(sorted(order[drop_count:]))
+
+        q8, q_scale = _quantize(query_vec)
+        row = q8.reshape(1, -1)
+        scale = np.asarray([q_scale], dtype=np.float32)
+        if bucket.vectors is None:
+            bucket.vectors, bucket.scales = row, scale
+        else:
+            bucket.vectors = np.vstack([bucket.vectors, row])
+            bucket.scales = np.concatenate([bucket.scales, scale])
+        bucket.responses.append(copy.deepcopy(response))
+        bucket.created_at.append(now)
+        bucket.last_used.append(now)
+
+
+def clear() -> None:
+    """캐시 전체를 비웁니다. (재인덱싱 이후 등)"""
+    with _lock:
+        _buckets.clear()
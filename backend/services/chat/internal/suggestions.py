@@ -1,70 +1,110 @@
 from __future__ import annotations
 
-from typing import List, Optional, Dict, Any
+from functools import lru_cache
+from typing import List, Optional, Dict, Any, FrozenSet, Tuple
 import re
 
 from .constants import QUERY_STOP_TOKENS
 
-
-def _question_match_score(query: str, question: str) -> int:
-    """사용자 질문과 FAQ 질문 간의 간단 매칭 점수."""
-    if not query or not question:
-        return 0
-
-    q = query.lower()
-    t = question.lower()
-
-    tokens = re.findall(r"[0-9a-z가-힣]{2,}", q)
-    if not tokens:
-        return 0
-
-    tokens = [tok for tok in tokens if tok not in QUERY_STOP_TOKENS]
-    if not tokens:
-        return 0
-
-    return sum(1 for tok in tokens if tok in t)
-
-
-def _get_default_questions(product_id: int) -> List[str]:
-    """상품별 기본 FAQ 질문"""
+# 2글자 이상(한글/영문/숫자) 토큰
+_TOKEN_RE = re.compile(r"[0-9a-z가-힣]{2,}")
+_TOKEN_FINDALL = _TOKEN_RE.findall
+
+
+def _tokenize(query: str) -> FrozenSet[str]:
+    """질문을 2글자 이상 토큰 집합으로 나누고 불용어를 제외합니다."""
+    if not query:
+        return frozenset()
+    # 불용어 제외는 토큰마다 전역 조회/비교하지 않고 frozenset 차집합(C 레벨) 한 번으로 처리합니다.
+    return frozenset(_TOKEN_FINDALL(query.lower())).difference(QUERY_STOP_TOKENS)
+
+
+def _question_signature(question: str) -> FrozenSet[str]:
+    """
+    FAQ 질문의 토큰 시그니처
+    - 각 토큰의 2글자 이상 부분 문자열을 모두 포함합니다. 조사가 붙은 단어("소재는")나
+      합성어 중간("유통기한은"의 "기한", "멸치쌀국수"의 "쌀국수")도 집합 교집합만으로 매칭됩니다.
+    - 사용자 질문 토큰은 같은 문자 클래스의 연속 구간이므로, 질문 전체 문자열에 대한
+      부분 문자열 검사(tok in question.lower())와 매칭 결과가 같습니다.
+    """
+    sig = set()
+    for tok in _TOKEN_FINDALL(question.lower()):
+        n = len(tok)
+        sig.update(tok[i:j] for i in range(n - 1) for j in range(i + 2, n + 1))
+    return frozenset(sig)
+
+
+# 상품을 찾지 못했을 때의 기본 FAQ
+_FALLBACK_QUESTIONS = (
+    "이 제품의 핵심 특징을 알려주세요",
+    "구성품/옵션은 어떻게 되나요?",
+    "사이즈/무게는 어느 정도인가요?",
+    "사용/관리 방법을 알려주세요",
+    "배송/교환/반품은 어떻게 되나요?",
+)
+
+# 상품명 키워드별 FAQ 템플릿 ({name}에 상품명). 위에서부터 처음 일치하는 키워드를 사용합니다.
+# 카테고리를 추가할 때는 분기 대신 이 표에 한 줄을 추가하세요.
+_PRODUCT_KEYWORD_TEMPLATES: Tuple[Tuple[str, Tuple[str, ...]], ...] = (
+    ("이불", (
+        "{name} 소재는 무엇인가요?",
+        "{name} 세탁/관리 방법은 어떻게 되나요?",
+        "{name} 사이즈/구성 옵션을 알려주세요",
+        "{name} 두께감/계절감은 어떤가요?",
+        "배송/교환/반품은 어떻게 되나요?",
+    )),
+    ("쌀국수", (
+        "{name} 조리 방법을 알려주세요",
+        "{name} 매운 정도가 어떤가요?",
+        "{name} 보관/유통기한은 어떻게 되나요?",
+        "{name} 1인분 기준 양이 어느 정도인가요?",
+        "배송/교환/반품은 어떻게 되나요?",
+    )),
+)
+
+# 일치하는 키워드가 없을 때의 상품명 기반 FAQ 템플릿
+_DEFAULT_TEMPLATES = (
+    "{name} 핵심 특징을 알려주세요",
+    "{name} 구성품/옵션은 어떻게 되나요?",
+    "{name} 사이즈/무게는 어느 정도인가요?",
+    "{name} 사용/관리 방법을 알려주세요",
+    "배송/교환/반품은 어떻게 되나요?",
+)
+
+
+@lru_cache(maxsize=1024)
+def _get_default_questions(product_id: int) -> Tuple[str, ...]:
+    """
+    상품별 기본 FAQ 질문
+    - 상품명은 프로세스 수명 동안 바뀌지 않으므로 product_id별로 캐시합니다. (DB 조회 1회)
+    - 캐시 값이 공유되므로 수정할 수 없는 tuple로 반환합니다.
+    """
     from db.repository import get_product_by_id
 
     product: Optional[Dict[str, Any]] = get_product_by_id(product_id)
     if not product:
-        return [
-            "이 제품의 핵심 특징을 알려주세요",
-            "구성품/옵션은 어떻게 되나요?",
-            "사이즈/무게는 어느 정도인가요?",
-            "사용/관리 방법을 알려주세요",
-            "배송/교환/반품은 어떻게 되나요?",
-        ]
+        return _FALLBACK_QUESTIONS
 
     product_name = product.get("name", "제품")
 
     # 제품명 기반 FAQ 질문
-    if "이불" in product_name:
-        return [
-            f"{product_name} 소재는 무엇인가요?",
-            f"{product_name} 세탁/관리 방법은 어떻게 되나요?",
-            f"{product_name} 사이즈/구성 옵션을 알려주세요",
-            f"{product_name} 두께감/계절감은 어떤가요?",
-            "배송/교환/반품은 어떻게 되나요?",
-        ]
-    if "쌀국수" in product_name:
-        return [
-            f"{product_name} 조리 방법을 알려주세요",
-            f"{product_name} 매운 정도가 어떤가요?",
-            f"{product_name} 보관/유통기한은 어떻게 되나요?",
-            f"{product_name} 1인분 기준 양이 어느 정도인가요?",
-            "배송/교환/반품은 어떻게 되나요?",
-        ]
-    return [
-        f"{product_name} 핵심 특징을 알려주세요",
-        f"{product_name} 구성품/옵션은 어떻게 되나요?",
-        f"{product_name} 사이즈/무게는 어느 정도인가요?",
-        f"{product_name} 사용/관리 방법을 알려주세요",
-        "배송/교환/반품은 어떻게 되나요?",
-    ]
+    templates = next(
+        (tpl for keyword, tpl in _PRODUCT_KEYWORD_TEMPLATES if keyword in product_name),
+        _DEFAULT_TEMPLATES,
+    )
+    return tuple(t.format(name=product_name) for t in templates)
+
+
+@lru_cache(maxsize=1024)
+def _get_default_question_tokens(product_id: int) -> Tuple[Tuple[str, FrozenSet[str]], ...]:
+    """기본 FAQ 질문과 토큰 시그니처를 product_id별로 한 번만 계산해 둡니다."""
+    return tuple((q, _question_signature(q)) for q in _get_default_questions(product_id))
+
+
+def clear_default_questions_cache() -> None:
+    """상품 정보(상품명)가 바뀌었을 때 기본 FAQ 캐시를 비웁니다."""
+    _get_default_questions.cache_clear()
+    _get_default_question_tokens.cache_clear()
 
 
 def suggest_related_questions(
@@ -74,14 +114,19 @@ def suggest_related_questions(
     top_k: int = 2,
 ) -> List[str]:
     """사용자 질문과 관련된 FAQ 질문 추천"""
-    defaults = _get_default_questions(product_id)
-    candidates = [q for q in defaults if q not in asked_questions]
+    asked = set(asked_questions)
+    candidates = [(q, sig) for q, sig in _get_default_question_tokens(product_id) if q not in asked]
     if not candidates:
         return []
 
+    # 질문 토큰화는 한 번만, 점수는 미리 계산한 시그니처와의 교집합 크기로 계산합니다.
+    query_tokens = _tokenize(user_query)
+    if not query_tokens:
+        # 점수가 모두 0이면 정렬 결과는 기본 FAQ 순서 그대로이므로 채점/정렬을 건너뜁니다.
+        return [q for q, _ in candidates[:top_k]]
     scored = [
-        (question, _question_match_score(user_query, question), idx)
-        for idx, question in enumerate(candidates)
+        (question, len(query_tokens & sig), idx)
+        for idx, (question, sig) in enumerate(candidates)
     ]
 
     scored.sort(key=lambda x: (-x[1], x[2]))
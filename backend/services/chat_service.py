@@ -8,12 +8,17 @@
 from __future__ import annotations
 
 from typing import List, Optional, Dict, Any, Set
+import asyncio
 import logging
 
 from fastapi import HTTPException
 
-from rag.retriever import retrieve_context
-from llm.engine import generate_answer, get_available_engines
+from db.database import get_data_version
+from db.repository import clear_product_cache
+from rag.retriever import is_searchable_query, retrieve_context
+from rag.vector_store import get_store_version
+from llm.engine import generate_answer, get_available_engines, get_cache_namespace
+from llm import cache as llm_cache
 from llm.prompt import build_prompt_with_source_selection
 
 from .chat.internal.constants import (
@@ -21,19 +26,42 @@ from .chat.internal.constants import (
     DIRECT_QNA_ENABLED,
     DIRECT_QNA_MIN_SCORE,
     DIRECT_QNA_STRONG_SCORE,
+    SEMANTIC_CACHE_ENABLED,
+    EXACT_CACHE_ENABLED,
 )
 from .chat.internal.guards import (
+    detect_polarity,
     extract_json_object,
-    extract_qna_answer,
-    extract_qna_question,
     keyword_overlap,
     looks_like_template_garbage,
+    parse_qna,
 )
 from .chat.internal.responses import build_chat_response, build_no_rag_stop_response, context_to_source
-from .chat.internal.suggestions import suggest_related_questions
+from .chat.internal.suggestions import clear_default_questions_cache, suggest_related_questions
+from .chat.internal import exact_cache, semantic_cache
 
 logger = logging.getLogger(__name__)
 
+# 마지막으로 확인한 (DB, Chroma) 데이터 버전. 시드/재인덱싱은 워커(다른 프로세스)에서 일어나므로
+# 호출로 캐시를 비울 수 없고, 요청마다 저장 파일 상태를 비교해 바뀌었으면 비웁니다.
+_data_versions: Optional[tuple[str, str]] = None
+
+
+def _invalidate_caches_on_data_change() -> None:
+    """DB 시드/리셋이나 재인덱싱이 감지되면 이전 데이터로 만든 프로세스 내 캐시를 모두 비웁니다."""
+    global _data_versions
+    versions = (get_data_version(), get_store_version())
+    if _data_versions == versions:
+        return
+    if _data_versions is not None:
+        logger.info("DB/인덱스 변경 감지: 응답/프롬프트/상품 캐시를 비웁니다.")
+        exact_cache.clear()
+        semantic_cache.clear()
+        llm_cache.clear()
+        clear_product_cache()
+        clear_default_questions_cache()
+    _data_versions = versions
+
 
 def _ensure_engine_available(engine: str) -> str:
     """gemini만 허용하고, 사용 가능 여부를 확인합니다."""
@@ -61,9 +89,22 @@ def _retrieve_contexts(query: str, product_id: int, top_k: int = 5) -> List[Dict
     return retrieve_context(query=query, product_id=product_id, top_k=top_k)
 
 
+def _best_context(contexts: List[Dict[str, Any]]) -> tuple[Optional[Dict[str, Any]], float]:
+    """contexts를 한 번만 순회해 최고 점수 컨텍스트와 그 점수를 구합니다."""
+    best_ctx: Optional[Dict[str, Any]] = None
+    best_score = 0.0
+    for ctx in contexts:
+        score = float(ctx.get("score", 0.0) or 0.0)
+        if best_ctx is None or score > best_score:
+            best_ctx = ctx
+            best_score = score
+    return best_ctx, best_score
+
+
 def _build_stop_response_if_needed(
     *,
     contexts: List[Dict[str, Any]],
+    best_score: float,
     selected_engine: str,
     product_id: int,
 ) -> Optional[Dict[str, Any]]:
@@ -76,7 +117,6 @@ def _build_stop_response_if_needed(
         return build_no_rag_stop_response(selected_engine=selected_engine, product_id=product_id)
 
     # 컨텍스트가 있더라도 유사도가 지나치게 낮으면, 잘못된 추론 답변이 나올 수 있어 가드합니다.
-    best_score = max((ctx.get("score", 0.0) for ctx in contexts), default=0.0)
     if best_score < MIN_CONTEXT_SCORE:
         logger.warning(
             "컨텍스트 유사도 낮음(best_score=%.3f). LLM 호출 없이 폴백 응답 반환",
@@ -89,14 +129,17 @@ def _build_stop_response_if_needed(
 
 
 def _try_direct_qna_answer(
+    *,
     query: str,
-    contexts: List[Dict[str, Any]],
+    best_ctx: Optional[Dict[str, Any]],
+    best_score: float,
     selected_engine: str,
     product_id: int,
 ) -> Optional[Dict[str, Any]]:
     """
     (옵션) QnA direct return.
     env CHAT_DIRECT_QNA_ENABLED가 켜져있고 조건 충족 시 LLM 호출 없이 QnA 답변을 반환합니다.
+    - best_ctx/best_score는 _best_context 결과를 그대로 받습니다. (contexts 재순회/점수 재계산 없음)
     """
     # QnA 문서가 가장 유력하면 LLM을 거치지 않고 원문 답변을 바로 반환합니다.
     # NOTE: "QnA 직접 반환"은 질문 의도를 무시하는 단답을 만들기 쉬워 기본 비활성화합니다.
@@ -104,26 +147,20 @@ def _try_direct_qna_answer(
     if not DIRECT_QNA_ENABLED:
         return None
 
-    if not contexts:
+    if best_ctx is None:
         return None
 
-    best_ctx = max(contexts, key=lambda c: c.get("score", 0.0))
-    if not (
-        best_ctx.get("type") == "qna"
-        and float(best_ctx.get("score", 0.0) or 0.0) >= DIRECT_QNA_MIN_SCORE
-    ):
+    if not (best_ctx.get("type") == "qna" and best_score >= DIRECT_QNA_MIN_SCORE):
         return None
 
-    qna_content = best_ctx.get("content", "") or ""
-    qna_question = extract_qna_question(qna_content) or ""
-    score = float(best_ctx.get("score", 0.0) or 0.0)
+    qna_question, direct = parse_qna(best_ctx.get("content", "") or "")
+    qna_question = qna_question or ""
 
     # 직접 반환은 매우 보수적으로: 질문 키워드가 QnA 질문(Q:)에 실제로 겹칠 때만 허용합니다.
     # (답변(A:) 매칭까지 허용하면 "질문 의도 무시" 단답이 더 자주 발생합니다.)
-    if not (keyword_overlap(query, qna_question) and score >= DIRECT_QNA_STRONG_SCORE):
+    if not (keyword_overlap(query, qna_question) and best_score >= DIRECT_QNA_STRONG_SCORE):
         return None
 
-    direct = extract_qna_answer(qna_content)
     if not direct:
         return None
 
@@ -137,19 +174,35 @@ def _try_direct_qna_answer(
     )
 
 
-def _build_prompt(query: str, contexts: List[Dict[str, Any]], product_id: int) -> str:
+def _build_prompt(
+    query: str,
+    contexts: List[Dict[str, Any]],
+    product_id: int,
+    polarity_hint: str,
+) -> str:
     """build_prompt_with_source_selection 호출을 래핑합니다."""
     return build_prompt_with_source_selection(
         query=query,
         contexts=contexts,
         product_id=product_id,
+        polarity_hint=polarity_hint,
     )
 
 
-async def _run_llm(prompt: str, selected_engine: str) -> str:
-    """generate_answer 호출을 래핑합니다."""
-    logger.info("%s 엔진으로 답변 생성 중...", selected_engine)
-    return await generate_answer(prompt=prompt, engine=selected_engine)
+async def _run_llm(prompt: str, selected_engine: str, cache_key: bytes) -> str:
+    """
+    generate_answer 호출을 래핑합니다.
+    - 같은 프롬프트면 캐시된 응답을 재사용하고, 동시에 들어온 같은 프롬프트는 한 번만 호출합니다.
+    """
+
+    async def _generate() -> str:
+        logger.info("%s 엔진으로 답변 생성 중...", selected_engine)
+        return await generate_answer(prompt=prompt, engine=selected_engine)
+
+    text, hit = await llm_cache.get_or_generate(cache_key, _generate)
+    if hit:
+        logger.info("프롬프트 캐시 적중: LLM 호출을 건너뜁니다.")
+    return text
 
 
 def _parse_llm_output(raw_text: str) -> tuple[str, List[str]]:
@@ -179,10 +232,15 @@ def _filter_sources_by_used_ids(
     contexts: List[Dict[str, Any]],
     used_source_ids: List[str],
 ) -> List[Dict[str, Any]]:
-    """used_source_ids에 포함된 source_id만 sources로 변환합니다(dict 형식 유지)."""
+    """
+    used_source_ids에 포함된 source_id만 sources로 변환합니다(dict 형식 유지).
+    - 순서는 검색 결과(contexts) 순서를 유지하고, 같은 ID가 여러 번 와도 한 번만 포함합니다.
+    """
+    # JSON 파싱 실패/근거 없음 안내 등 used_source_ids가 비어 있는 경우가 흔하므로 바로 종료합니다.
+    if not used_source_ids:
+        return []
     used_set: Set[str] = set(used_source_ids)
-    used_contexts = [ctx for ctx in contexts if str(ctx.get("source_id") or "") in used_set]
-    return [context_to_source(ctx) for ctx in used_contexts]
+    return [context_to_source(ctx) for ctx in contexts if str(ctx.get("source_id") or "") in used_set]
 
 
 def _suggest_questions(
@@ -200,6 +258,26 @@ def _suggest_questions(
     )
 
 
+async def _refresh_cached_response(
+    cached: Dict[str, Any],
+    query: str,
+    product_id: int,
+    conversation_history: List[str],
+) -> Dict[str, Any]:
+    """
+    캐시 응답을 재사용하되, 대화 이력에 따라 달라지는 추천 질문만 다시 계산합니다.
+    - 추천 질문은 DB 조회를 포함하므로 캐시 미스 경로와 동일하게 스레드로 넘깁니다.
+    """
+    cached["suggested_questions"] = await asyncio.to_thread(
+        _suggest_questions,
+        query=query,
+        product_id=product_id,
+        conversation_history=conversation_history,
+        top_k=2,
+    )
+    return cached
+
+
 async def handle_chat(
     *,
     query: str,
@@ -216,17 +294,46 @@ async def handle_chat(
     try:
         # 0. 사용 가능 여부 확인
         selected_engine = _ensure_engine_available(engine)
-
-        logger.info("질문: %s", query)
-        logger.info("상품 ID: %s, 엔진: %s", product_id, selected_engine)
+        _invalidate_caches_on_data_change()
+
+        # 요청마다 남기는 진행 로그(breadcrumb)는 INFO가 꺼져 있으면 호출 자체를 건너뜁니다.
+        # (경고/캐시 적중 등 실제 이벤트 로그는 그대로 둡니다)
+        info_enabled = logger.isEnabledFor(logging.INFO)
+        if info_enabled:
+            logger.info("질문: %s", query)
+            logger.info("상품 ID: %s, 엔진: %s", product_id, selected_engine)
+
+        # 0-1. 완전 일치 캐시 (정규화한 질문이 같으면 임베딩/검색/LLM 모두 생략)
+        if EXACT_CACHE_ENABLED:
+            cached = exact_cache.lookup(product_id, query)
+            if cached is not None:
+                logger.info("완전 일치 캐시 적중: 검색/LLM 호출을 건너뜁니다.")
+                return await _refresh_cached_response(cached, query, product_id, conversation_history)
+
+        # 질문 극성(부정형 여부)은 요청당 한 번 계산해 시맨틱 캐시 키와 프롬프트 힌트에 함께 씁니다.
+        polarity = detect_polarity(query)
+
+        # 0-2. 시맨틱 캐시 (같은 상품 + 같은 극성의 거의 같은 질문이면 검색/LLM 호출 생략)
+        query_vec = None
+        if SEMANTIC_CACHE_ENABLED and is_searchable_query(query):
+            # 임베딩은 모델 추론(동기)이므로 이벤트 루프를 막지 않도록 스레드에서 실행합니다.
+            query_vec = await asyncio.to_thread(semantic_cache.embed_query, query)
+            cached = semantic_cache.lookup(product_id, query_vec, is_negative=polarity["is_negative"])
+            if cached is not None:
+                logger.info("시맨틱 캐시 적중: 검색/LLM 호출을 건너뜁니다.")
+                return await _refresh_cached_response(cached, query, product_id, conversation_history)
 
         # 1. 근거 검색 (product_id로 범위 제한)
-        logger.info("컨텍스트 검색 중...")
-        contexts = _retrieve_contexts(query=query, product_id=product_id, top_k=5)
+        if info_enabled:
+            logger.info("컨텍스트 검색 중...")
+        # 임베딩 + Chroma 조회는 동기 호출이므로 워커 스레드로 넘겨 다른 요청을 계속 처리합니다.
+        contexts = await asyncio.to_thread(_retrieve_contexts, query=query, product_id=product_id, top_k=5)
 
         # 2. 근거 부족 시 즉시 종료(안내 응답)
+        best_ctx, best_score = _best_context(contexts)
         stop_response = _build_stop_response_if_needed(
             contexts=contexts,
+            best_score=best_score,
             selected_engine=selected_engine,
             product_id=product_id,
         )
@@ -236,7 +343,8 @@ async def handle_chat(
         # 3. (옵션) QnA direct return
         direct_response = _try_direct_qna_answer(
             query=query,
-            contexts=contexts,
+            best_ctx=best_ctx,
+            best_score=best_score,
             selected_engine=selected_engine,
             product_id=product_id,
         )
@@ -244,10 +352,26 @@ async def handle_chat(
             return direct_response
 
         # 4. 프롬프트 생성
-        prompt = _build_prompt(query=query, contexts=contexts, product_id=product_id)
-
-        # 5. LLM 호출
-        raw_text = await _run_llm(prompt=prompt, selected_engine=selected_engine)
+        prompt = _build_prompt(
+            query=query,
+            contexts=contexts,
+            product_id=product_id,
+            polarity_hint=polarity["hint"],
+        )
+        prompt_key = llm_cache.prompt_key(get_cache_namespace(selected_engine), prompt)
+
+        # 5. LLM 호출 + 추천 질문 생성
+        # 두 작업은 서로 독립적이므로, 추천 질문(DB 조회 포함)을 LLM 대기 시간 뒤에 숨깁니다.
+        raw_text, suggested = await asyncio.gather(
+            _run_llm(prompt=prompt, selected_engine=selected_engine, cache_key=prompt_key),
+            asyncio.to_thread(
+                _suggest_questions,
+                query=query,
+                product_id=product_id,
+                conversation_history=conversation_history,
+                top_k=2,
+            ),
+        )
 
         # 6. LLM 출력 파싱(answer + used_source_ids)
         answer, used_source_ids = _parse_llm_output(raw_text)
@@ -257,26 +381,27 @@ async def handle_chat(
             logger.warning("LLM 출력이 템플릿/메타 문구로 보입니다. Q&A 문의 안내로 폴백합니다.")
             return build_no_rag_stop_response(selected_engine=selected_engine, product_id=product_id)
 
+        # 가드를 통과한 출력만 캐시합니다. (비정상 출력이 재사용되지 않도록)
+        llm_cache.put(prompt_key, raw_text)
+
         # 8. used_source_ids 기반 sources 필터링
         sources = _filter_sources_by_used_ids(contexts, used_source_ids)
 
-        # 9. 추천 질문 생성
-        suggested = _suggest_questions(
-            query=query,
-            product_id=product_id,
-            conversation_history=conversation_history,
-            top_k=2,
-        )
-
-        logger.info("답변 생성 완료")
+        if info_enabled:
+            logger.info("답변 생성 완료")
 
-        return build_chat_response(
+        response = build_chat_response(
             answer=answer,
             sources=sources,
             selected_engine=selected_engine,
             product_id=product_id,
             suggested_questions=suggested,
         )
+        if EXACT_CACHE_ENABLED:
+            exact_cache.store(product_id, query, response)
+        if query_vec is not None:
+            semantic_cache.store(product_id, query_vec, response, is_negative=polarity["is_negative"])
+        return response
 
     except HTTPException:
         raise
@@ -0,0 +1,3 @@
+"""
+공통 유틸 패키지 (레이어와 무관하게 llm/rag/services/worker에서 함께 사용)
+"""
@@ -0,0 +1,47 @@
+"""
+환경변수 파싱 헬퍼
+- 설정값은 보통 import 시점에 한 번 읽어 모듈 상수로 둡니다.
+- 값이 비어 있거나 형식이 잘못되면 기본값을 사용합니다. (오타 하나로 서버가 뜨지 않는 일이 없도록)
+"""
+from __future__ import annotations
+
+from typing import FrozenSet, List
+import os
+
+_TRUTHY: FrozenSet[str] = frozenset({"1", "true", "yes", "y", "on"})
+
+
+def load_bool_env(name: str, default: bool) -> bool:
+    """불리언 환경변수를 파싱합니다. (미설정이면 default)"""
+    raw = os.getenv(name)
+    if raw is None:
+        return default
+    return raw.lower() in _TRUTHY
+
+
+def load_int_env(name: str, default: int) -> int:
+    """정수 환경변수를 파싱합니다. (미설정/형식 오류면 default)"""
+    try:
+        return int(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+
+def load_float_env(name: str, default: float) -> float:
+    """실수 환경변수를 파싱합니다. (미설정/형식 오류면 default)"""
+    try:
+        return float(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+
+def load_csv_env(name: str, default: List[str]) -> List[str]:
+    """
+    콤마(,)로 구분된 환경변수를 리스트로 파싱합니다.
+    - 운영 중 튜닝을 위해 룰/키워드를 코드 하드코딩으로 두지 않습니다.
+    """
+    raw = os.getenv(name)
+    if not raw:
+        return default
+    parts = [p.strip() for p in raw.split(",")]
+    return [p for p in parts if p]
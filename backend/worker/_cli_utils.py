@@ -0,0 +1,22 @@
+"""
+워커 CLI 공통 유틸 (bootstrap_dev / rag_index)
+"""
+
+from __future__ import annotations
+
+from typing import List, Optional
+
+
+def parse_product_ids(raw: Optional[str]) -> Optional[List[int]]:
+    """
+    --product-ids 값("1,2,3")을 정수 리스트로 변환합니다.
+    - 빈 값/빈 항목만 있으면 None (전체 대상)
+    - 숫자가 아닌 항목이 있으면 트레이스백 대신 옵션 이름이 포함된 메시지로 종료합니다.
+    """
+    if not raw:
+        return None
+    try:
+        ids = [int(p) for p in (part.strip() for part in raw.split(",")) if p]
+    except ValueError as e:
+        raise SystemExit(f"--product-ids 파싱 실패: {e}")
+    return ids or None
@@ -13,23 +13,14 @@ from __future__ import annotations
 
 import argparse
 import logging
-import os
-from typing import List, Optional
 
 from dotenv import load_dotenv
 
 from db.database import init_db
 from worker.dev_seed import seed_dummies_if_needed
 from rag.indexer import index_products
-
-
-def _parse_product_ids(raw: Optional[str]) -> Optional[List[int]]:
-    if not raw:
-        return None
-    parts = [p.strip() for p in raw.split(",") if p.strip()]
-    if not parts:
-        return None
-    return [int(p) for p in parts]
+from utils.env import load_bool_env
+from worker._cli_utils import parse_product_ids
 
 
 def main() -> int:
@@ -93,16 +84,10 @@ def main() -> int:
         logger.info("RAG 인덱싱을 건너뜁니다 (--skip-index).")
         return 0
 
-    product_ids = _parse_product_ids(args.product_ids)
+    product_ids = parse_product_ids(args.product_ids)
     clear_on_index = args.clear
     if clear_on_index is None:
-        clear_on_index = os.getenv("RAG_CLEAR_COLLECTION_ON_INDEX", "true").lower() in [
-            "1",
-            "true",
-            "yes",
-            "y",
-            "on",
-        ]
+        clear_on_index = load_bool_env("RAG_CLEAR_COLLECTION_ON_INDEX", True)
 
     logger.info("RAG 인덱싱 시작 (product_ids=%s, clear_on_index=%s)", product_ids, clear_on_index)
     stats = index_products(product_ids=product_ids, clear_on_index=clear_on_index)
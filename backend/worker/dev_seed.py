@@ -5,14 +5,15 @@
 
 from __future__ import annotations
 
-import csv
 import json
 import logging
-import os
+import mmap
 from pathlib import Path
 from typing import Optional
 
-from db.database import get_connection
+from db.database import create_indexes, drop_indexes, get_connection
+from db.repository import clear_product_cache
+from utils.env import load_bool_env
 
 logger = logging.getLogger(__name__)
 
@@ -25,8 +26,7 @@ def should_seed_dummies(seed_flag: Optional[bool] = None) -> bool:
     """
     if seed_flag is not None:
         return seed_flag
-    raw = os.getenv("DATABASE_SEED_DUMMIES")
-    return raw is not None and raw.lower() in ["1", "true", "yes", "y", "on"]
+    return load_bool_env("DATABASE_SEED_DUMMIES", False)
 
 
 _PRODUCT_ORDER = ["blanket_001", "monitor_001", "noodle_001", "sidiz_t20"]
@@ -44,8 +44,27 @@ _IMAGE_MAP = {
 }
 
 
-def _dummy_root() -> Path:
-    return Path(__file__).resolve().parents[2] / "dummies"
+# 로더는 행을 dict가 아닌 아래 컬럼 순서의 tuple로 만들어, INSERT에 재포장 없이 바로 바인딩합니다.
+_PRODUCT_COLUMNS = ("id", "name", "image_url", "price", "category", "description")
+_REVIEW_COLUMNS = ("id", "product_id", "user_name", "review_text", "rating")
+_QNA_COLUMNS = ("id", "product_id", "question", "answer")
+
+
+# 더미 데이터 폴더 (repo 루트/dummies). resolve()는 import 시 한 번만 수행합니다.
+_DUMMY_ROOT = Path(__file__).resolve().parents[2] / "dummies"
+
+
+# (라벨, meta 키, 리스트 여부) - 소개 문장에 들어가는 순서 그대로입니다.
+_DESC_FIELDS = (
+    ("주요 특징", "features", True),
+    ("옵션", "variants", True),
+    ("색상", "colors", True),
+    ("사이즈", "sizes", True),
+    ("소재", "materials", True),
+    ("배송", "delivery_time", False),
+    ("유통기한", "shelf_life", False),
+    ("중량", "weight", False),
+)
 
 
 def _compose_description(meta: dict) -> str:
@@ -54,22 +73,10 @@ def _compose_description(meta: dict) -> str:
     category = meta.get("category", "")
 
     parts = []
-    if meta.get("features"):
-        parts.append(f"주요 특징: {', '.join(meta['features'])}")
-    if meta.get("variants"):
-        parts.append(f"옵션: {', '.join(meta['variants'])}")
-    if meta.get("colors"):
-        parts.append(f"색상: {', '.join(meta['colors'])}")
-    if meta.get("sizes"):
-        parts.append(f"사이즈: {', '.join(meta['sizes'])}")
-    if meta.get("materials"):
-        parts.append(f"소재: {', '.join(meta['materials'])}")
-    if meta.get("delivery_time"):
-        parts.append(f"배송: {meta['delivery_time']}")
-    if meta.get("shelf_life"):
-        parts.append(f"유통기한: {meta['shelf_life']}")
-    if meta.get("weight"):
-        parts.append(f"중량: {meta['weight']}")
+    for label, key, is_list in _DESC_FIELDS:
+        value = meta.get(key)
+        if value:
+            parts.append(f"{label}: {', '.join(value) if is_list else value}")
 
     summary = " ".join(parts)
     if not summary:
@@ -78,7 +85,7 @@ def _compose_description(meta: dict) -> str:
 
 
 def _load_dummy_products():
-    path = _dummy_root() / "product_info.json"
+    path = _DUMMY_ROOT / "product_info.json"
     if not path.exists():
         logger.warning("product_info.json을 찾을 수 없습니다: %s", path)
         return [], {}
@@ -93,77 +100,119 @@ def _load_dummy_products():
     for slug in slug_order:
         meta = data.get(slug, {})
         products.append(
-            {
-                "id": slug_to_id[slug],
-                "slug": slug,
-                "name": meta.get("name", slug),
-                "category": meta.get("category", "기타"),
-                "description": _compose_description(meta),
-                "price": _PRICE_MAP.get(slug, 10000),
-                "image_url": _IMAGE_MAP.get(slug, f"/images/products/{slug}.jpg"),
-            }
+            (
+                slug_to_id[slug],
+                meta.get("name", slug),
+                _IMAGE_MAP.get(slug, f"/images/products/{slug}.jpg"),
+                _PRICE_MAP.get(slug, 10000),
+                meta.get("category", "기타"),
+                _compose_description(meta),
+            )
         )
 
     return products, slug_to_id
 
 
+def _iter_tsv_rows(path: Path, fields: tuple):
+    """
+    TSV 파일을 mmap 하고 바이트 단위로 줄/탭을 찾아, fields 컬럼 값만 tuple로 반환합니다.
+    - 행마다 dict를 만들지 않고, 사용하는 컬럼만 디코드합니다.
+    - 더미 TSV는 따옴표 이스케이프가 없는 단순 형식이라는 전제입니다. (csv 모듈의 quoting 미지원)
+    - 헤더에 없는 컬럼은 None, 행에 값이 모자라면 ""로 채웁니다.
+    """
+    with path.open("rb") as f:
+        try:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # 빈 파일은 mmap 할 수 없습니다.
+            return
+    with mm:
+        if hasattr(mm, "madvise") and hasattr(mmap, "MADV_SEQUENTIAL"):
+            mm.madvise(mmap.MADV_SEQUENTIAL)
+
+        size = len(mm)
+        nl = mm.find(b"\n")
+        end = size if nl < 0 else nl
+        header = mm[:end].rstrip(b"\r").decode("utf-8").split("\t")
+        col_index = {name: i for i, name in enumerate(header)}
+        indexes = [col_index.get(name) for name in fields]
+
+        pos = end + 1
+        while pos < size:
+            nl = mm.find(b"\n", pos)
+            end = size if nl < 0 else nl
+            line = mm[pos:end].rstrip(b"\r")
+            pos = end + 1
+            if not line:
+                continue
+            cols = line.split(b"\t")
+            yield tuple(
+                None if i is None else (cols[i].decode("utf-8") if i < len(cols) else "")
+                for i in indexes
+            )
+
+
+def _iter_dummy_tsv(pattern: str, slug_to_id: dict, fields: tuple):
+    """
+    @dummies/{pattern} TSV 파일들을 순회하며 (product_id, fields 값 tuple)을 반환합니다.
+    - 리뷰/QnA 로더가 공유하는 일괄 로딩 경로입니다. 알 수 없는 상품 행은 경고 후 제외합니다.
+    """
+    for path in sorted(_DUMMY_ROOT.glob(pattern)):
+        for slug, *values in _iter_tsv_rows(path, ("product_id",) + fields):
+            product_id = slug_to_id.get(slug)
+            if not product_id:
+                logger.warning("알 수 없는 product_id(%s) - 파일 %s", slug, path.name)
+                continue
+            yield product_id, values
+
+
 def _load_dummy_reviews(slug_to_id: dict):
     """@dummies/reviews_* 파일에서 리뷰 로드"""
     reviews = []
-    root = _dummy_root()
-    user_counter = 1
-
-    for path in sorted(root.glob("reviews_*_all.txt")):
-        with path.open("r", encoding="utf-8") as f:
-            reader = csv.DictReader(f, delimiter="\t")
-            for row in reader:
-                slug = row.get("product_id")
-                product_id = slug_to_id.get(slug)
-                if not product_id:
-                    logger.warning("알 수 없는 product_id(%s) - 파일 %s", slug, path.name)
-                    continue
-                review_text = (row.get("review_text") or "").strip()
-                rating_raw = row.get("rating")
-                rating = int(rating_raw) if rating_raw else None
-                user_name = f"리뷰어 {user_counter}"
-                user_counter += 1
-                reviews.append(
-                    {
-                        "product_id": product_id,
-                        "user_name": user_name,
-                        "review_text": review_text,
-                        "rating": rating,
-                    }
-                )
+    for product_id, (rating_raw, review_text) in _iter_dummy_tsv(
+        "reviews_*_all.txt", slug_to_id, ("rating", "review_text")
+    ):
+        rating = int(rating_raw) if rating_raw else None
+        seq = len(reviews) + 1
+        reviews.append((seq, product_id, f"리뷰어 {seq}", (review_text or "").strip(), rating))
     return reviews
 
 
 def _load_dummy_qnas(slug_to_id: dict):
     """@dummies/qna_* 파일에서 QnA 로드"""
     qnas = []
-    root = _dummy_root()
-
-    for path in sorted(root.glob("qna_*_all.txt")):
-        with path.open("r", encoding="utf-8") as f:
-            reader = csv.DictReader(f, delimiter="\t")
-            for row in reader:
-                slug = row.get("product_id")
-                product_id = slug_to_id.get(slug)
-                if not product_id:
-                    logger.warning("알 수 없는 product_id(%s) - 파일 %s", slug, path.name)
-                    continue
-                question = (row.get("question") or "").strip()
-                answer = (row.get("answer") or "").strip()
-                qnas.append(
-                    {
-                        "product_id": product_id,
-                        "question": question,
-                        "answer": answer,
-                    }
-                )
+    for product_id, (question, answer) in _iter_dummy_tsv(
+        "qna_*_all.txt", slug_to_id, ("question", "answer")
+    ):
+        qnas.append((len(qnas) + 1, product_id, (question or "").strip(), (answer or "").strip()))
     return qnas
 
 
+# 구버전 SQLite의 바인딩 변수 상한(SQLITE_MAX_VARIABLE_NUMBER=999)을 넘지 않도록 나눕니다.
+_MAX_BIND_VARS = 999
+# 문장이 너무 길어지면 파싱 비용이 커지므로 한 문장당 행 수도 제한합니다.
+_MAX_ROWS_PER_INSERT = 100
+
+
+def _insert_rows(cursor, table: str, columns: tuple, rows: list) -> None:
+    """
+    여러 행을 INSERT ... VALUES (...),(...) 다중 행 문장으로 삽입합니다.
+    - 행마다 VDBE step을 도는 executemany보다 문장 수가 줄어듭니다.
+    - 모든 행이 결정적인 id를 가지므로 OR IGNORE로 재실행해도 중복 삽입되지 않습니다.
+    """
+    if not rows:
+        return
+    width = len(columns)
+    per_stmt = max(1, min(_MAX_ROWS_PER_INSERT, _MAX_BIND_VARS // width))
+    row_ph = "(" + ", ".join("?" * width) + ")"
+    col_sql = ", ".join(columns)
+    for start in range(0, len(rows), per_stmt):
+        chunk = rows[start : start + per_stmt]
+        cursor.execute(
+            f"INSERT OR IGNORE INTO {table} ({col_sql}) VALUES {', '.join([row_ph] * len(chunk))}",
+            [v for row in chunk for v in row],
+        )
+
+
 def seed_data(conn):
     """@dummies 폴더 기반 더미 데이터 삽입"""
     cursor = conn.cursor()
@@ -172,59 +221,43 @@ def seed_data(conn):
     if not products:
         raise RuntimeError("더미 상품 정보를 찾을 수 없습니다. @dummies/product_info.json을 확인하세요.")
 
-    for product in products:
-        cursor.execute(
-            """
-            INSERT INTO products (id, name, image_url, price, category, description)
-            VALUES (?, ?, ?, ?, ?, ?)
-            """,
-            (
-                product["id"],
-                product["name"],
-                product["image_url"],
-                product["price"],
-                product["category"],
-                product["description"],
-            ),
-        )
-
     reviews = _load_dummy_reviews(slug_to_id)
-    for review in reviews:
-        cursor.execute(
-            """
-            INSERT INTO order_reviews (product_id, user_name, review_text, rating)
-            VALUES (?, ?, ?, ?)
-            """,
-            (
-                review["product_id"],
-                review["user_name"],
-                review["review_text"],
-                review["rating"],
-            ),
-        )
-
     qnas = _load_dummy_qnas(slug_to_id)
-    for qna in qnas:
-        cursor.execute(
-            """
-            INSERT INTO product_qna (product_id, question, answer)
-            VALUES (?, ?, ?)
-            """,
-            (
-                qna["product_id"],
-                qna["question"],
-                qna["answer"],
-            ),
-        )
 
-    conn.commit()
+    # 상품/리뷰/QnA를 하나의 트랜잭션으로 삽입합니다.
+    # - 행마다 커밋(fsync)하지 않고, 실패 시 전체 롤백되어 반쯤 시드된 DB가 남지 않습니다.
+    # - BEGIN IMMEDIATE로 처음부터 쓰기 잠금을 잡아, 동시 워커와의 "database is locked" 경합을 피합니다.
+    cursor.execute("BEGIN IMMEDIATE")
+    try:
+        # FK 위반 검사를 COMMIT 시점으로 미룹니다. (트랜잭션이 끝나면 자동으로 OFF)
+        cursor.execute("PRAGMA defer_foreign_keys=ON")
+
+        # 빈 테이블에 대량 삽입하므로 인덱스는 삽입 후에 한 번에 만듭니다.
+        drop_indexes(cursor)
+
+        _insert_rows(cursor, "products", _PRODUCT_COLUMNS, products)
+        _insert_rows(cursor, "order_reviews", _REVIEW_COLUMNS, reviews)
+        _insert_rows(cursor, "product_qna", _QNA_COLUMNS, qnas)
+
+        create_indexes(cursor)
+        # 쿼리 플래너가 새 인덱스를 쓰도록 통계를 갱신합니다.
+        cursor.execute("ANALYZE")
+        cursor.execute("COMMIT")
+    except Exception:
+        cursor.execute("ROLLBACK")
+        raise
+
+    clear_product_cache()
+
+    cursor.execute("PRAGMA optimize")
 
 
 def _has_existing_products(cursor) -> bool:
     try:
-        cursor.execute("SELECT COUNT(1) FROM products")
+        # 비어 있는지만 알면 되므로 전체를 세지 않고 첫 행에서 멈춥니다.
+        cursor.execute("SELECT EXISTS (SELECT 1 FROM products LIMIT 1)")
         row = cursor.fetchone()
-        return bool(row and row[0] > 0)
+        return bool(row and row[0])
     except Exception:
         return False
 
@@ -237,12 +270,9 @@ def seed_dummies_if_needed(seed_flag: Optional[bool] = None):
 
     conn = get_connection()
     cursor = conn.cursor()
-    try:
-        if _has_existing_products(cursor):
-            logger.info("기존 데이터가 있어 더미 시드를 건너뜁니다.")
-            return
-        logger.info("더미 데이터 시드 중... (@dummies 사용)")
-        seed_data(conn)
-        logger.info("더미 데이터 시드 완료")
-    finally:
-        conn.close()
+    if _has_existing_products(cursor):
+        logger.info("기존 데이터가 있어 더미 시드를 건너뜁니다.")
+        return
+    logger.info("더미 데이터 시드 중... (@dummies 사용)")
+    seed_data(conn)
+    logger.info("더미 데이터 시드 완료")
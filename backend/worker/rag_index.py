@@ -8,6 +8,7 @@ RAG 인덱싱 워커
 옵션:
   --product-ids 1,2,3   특정 상품만 인덱싱
   --clear / --no-clear  컬렉션 초기화 여부
+  --batch-size 512      한 번에 임베딩/upsert할 청크 수 (기본: RAG_INDEX_BATCH_SIZE)
 
 보안:
 - 이 워커는 LLM API 키가 필요하지 않습니다(임베딩은 로컬 모델 사용).
@@ -18,22 +19,13 @@ from __future__ import annotations
 
 import argparse
 import logging
-import os
-from typing import List, Optional
 
 from dotenv import load_dotenv
 
 from db.database import init_db
-from rag.indexer import index_products
-
-
-def _parse_product_ids(raw: Optional[str]) -> Optional[List[int]]:
-    if not raw:
-        return None
-    parts = [p.strip() for p in raw.split(",") if p.strip()]
-    if not parts:
-        return None
-    return [int(p) for p in parts]
+from rag.indexer import INDEX_BATCH_SIZE, index_products
+from utils.env import load_bool_env
+from worker._cli_utils import parse_product_ids
 
 
 def main() -> int:
@@ -67,6 +59,12 @@ def main() -> int:
         action="store_false",
         help="기존 컬렉션을 유지한 채 upsert합니다.",
     )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=INDEX_BATCH_SIZE,
+        help="한 번에 임베딩/upsert할 청크 수 (기본: RAG_INDEX_BATCH_SIZE 또는 512)",
+    )
     parser.set_defaults(clear=None)
 
     args = parser.parse_args()
@@ -75,19 +73,22 @@ def main() -> int:
     logger.info("DB 스키마 확인 중... (더미 데이터는 worker.bootstrap_dev로 시드)")
     init_db()
 
-    product_ids = _parse_product_ids(args.product_ids)
+    product_ids = parse_product_ids(args.product_ids)
     clear_on_index = args.clear
     if clear_on_index is None:
-        clear_on_index = os.getenv("RAG_CLEAR_COLLECTION_ON_INDEX", "true").lower() in [
-            "1",
-            "true",
-            "yes",
-            "y",
-            "on",
-        ]
-
-    logger.info("RAG 인덱싱 시작 (product_ids=%s, clear_on_index=%s)", product_ids, clear_on_index)
-    stats = index_products(product_ids=product_ids, clear_on_index=clear_on_index)
+        clear_on_index = load_bool_env("RAG_CLEAR_COLLECTION_ON_INDEX", True)
+
+    logger.info(
+        "RAG 인덱싱 시작 (product_ids=%s, clear_on_index=%s, batch_size=%s)",
+        product_ids,
+        clear_on_index,
+        args.batch_size,
+    )
+    stats = index_products(
+        product_ids=product_ids,
+        clear_on_index=clear_on_index,
+        batch_size=args.batch_size,
+    )
     logger.info("RAG 인덱싱 종료: %s", stats)
     return 0
 